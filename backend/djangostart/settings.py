@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',  # full-text search (SearchQuery/SearchRank, unaccent)
 
     # Thứ ba
     'rest_framework',
@@ -138,15 +139,75 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ================== CACHE ==================
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000
+# Cache phải dùng chung giữa các gunicorn worker (report cache + version theo user).
+# CACHE_BACKEND: redis | file | locmem
+#   - redis: set REDIS_URL (vd redis://localhost:6379/1), cần cài package "redis"
+#   - file: thư mục CACHE_DIR (mặc định backend/.cache), dùng chung trên 1 máy;
+#     add/incr không nguyên tử nên cache report + ETag theo user bị tắt
+#   - locmem: chỉ trong 1 process (runserver / test), cần TODO_CACHE_SINGLE_PROCESS=1
+#     để bật cache report + ETag theo user
+# Chạy test: python manage.py test --settings=djangostart.test_settings
+REDIS_URL = os.environ.get("REDIS_URL", "")
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "redis" if REDIS_URL else "file")
+TODO_CACHE_SINGLE_PROCESS = os.environ.get("TODO_CACHE_SINGLE_PROCESS", "0") == "1"
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'todo',
         }
     }
-}
+elif CACHE_BACKEND == "locmem":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get("CACHE_DIR", os.path.join(BASE_DIR, ".cache")),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000
+            }
+        }
+    }
+
+# Alias cache và TTL (giây) cho report; key report có version nên TTL dài vẫn an toàn
+TODO_CACHE_ALIAS = 'default'
+REPORT_CACHE_TIMEOUT = int(os.environ.get("REPORT_CACHE_TIMEOUT", "300"))
+
+# Sự kiện realtime cho /api/todos/stream/ (SSE, cần chạy bằng ASGI, xem gunicorn.conf.py):
+#   - local: chỉ phát trong process (runserver / 1 worker), nhiều worker bị từ chối
+#   - redis: phát qua Redis pub/sub cho mọi worker (mặc định khi có REDIS_URL)
+TODO_EVENTS_BACKEND = os.environ.get("TODO_EVENTS_BACKEND", "redis" if REDIS_URL else "local")
+TODO_EVENTS_QUEUE_SIZE = int(os.environ.get("TODO_EVENTS_QUEUE_SIZE", "100"))
+TODO_EVENTS_HEARTBEAT = int(os.environ.get("TODO_EVENTS_HEARTBEAT", "15"))
+# Thời hạn (giây) của ticket từ POST /api/todos/stream/ticket/
+TODO_STREAM_TICKET_TTL = int(os.environ.get("TODO_STREAM_TICKET_TTL", "60"))
+
+# Số ngày giữ tombstone cho /api/todos/changes/ (dọn bằng: manage.py prune_deleted_todos);
+# client không đồng bộ lâu hơn khoảng này nhận 410 và phải đồng bộ lại từ đầu
+TODO_SYNC_TOMBSTONE_DAYS = int(os.environ.get("TODO_SYNC_TOMBSTONE_DAYS", "30"))
+
+# Cache kết quả dự đoán AI: LRU trong mỗi process + (tuỳ chọn) cache dùng chung
+AI_PREDICTION_CACHE_SIZE = int(os.environ.get("AI_PREDICTION_CACHE_SIZE", "4096"))
+AI_PREDICTION_SHARED_CACHE = os.environ.get("AI_PREDICTION_SHARED_CACHE") or None
+
+# Model AI: thêm model khác theo tên, vd {"v2": "/models/model_v2.pkl"} ("default" = AI_MODEL_PATH)
+AI_MODELS = {}
+# Số giây giữa 2 lần kiểm tra mtime file model để tự load lại
+AI_MODEL_RELOAD_INTERVAL = int(os.environ.get("AI_MODEL_RELOAD_INTERVAL", "30"))
+AI_MODEL_MMAP = os.environ.get("AI_MODEL_MMAP", "1") == "1"
+# Nạp sẵn model trong AppConfig.ready() (gunicorn đã có hook riêng trong gunicorn.conf.py)
+AI_WARMUP = os.environ.get("AI_WARMUP", "0") == "1"
 
 
 # ================== CORS / CSRF ==================
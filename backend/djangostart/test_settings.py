@@ -0,0 +1,23 @@
+# Settings khi chạy test: python manage.py test --settings=djangostart.test_settings
+from .settings import *  # noqa: F401,F403
+
+# Không cấu hình PostgreSQL (DB_NAME) thì chạy test trên SQLite in-memory;
+# các phần chỉ có trên PostgreSQL (full-text search, unaccent) tự bỏ qua
+if not os.environ.get("DB_NAME"):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
+SECRET_KEY = SECRET_KEY or "test-secret-key"
+
+# Test chạy trong 1 process: locmem có add/incr nguyên tử
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'unique-snowflake',
+    }
+}
+TODO_CACHE_SINGLE_PROCESS = True
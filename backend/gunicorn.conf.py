@@ -0,0 +1,32 @@
+# gunicorn.conf.py – gunicorn tự đọc file này khi chạy trong thư mục backend/
+# vd: gunicorn   (số worker: WEB_CONCURRENCY hoặc -w N)
+#
+# Chạy app ASGI bằng uvicorn worker: /api/todos/stream/ (SSE) là view async,
+# mỗi kết nối chỉ là 1 coroutine; các view sync vẫn chạy trong thread pool.
+# Dưới WSGI (gunicorn djangostart.wsgi) stream trả 503.
+import os
+
+wsgi_app = "djangostart.asgi:application"
+worker_class = "uvicorn_worker.UvicornWorker"
+
+
+def on_starting(server):
+    """
+    Chặn khởi động khi chạy nhiều worker mà sự kiện realtime vẫn dùng backend
+    "local" (chỉ phát trong 1 process), xem todo.services.events.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "djangostart.settings")
+    from todo.services.events import check_events_backend
+
+    check_events_backend(server.cfg.workers)
+
+
+def post_worker_init(worker):
+    """
+    Nạp sẵn model AI ngay khi worker vừa load xong Django app (sau fork),
+    trước khi nhận request đầu tiên. Model được load với mmap nên các worker
+    dùng chung page cache của file model.
+    """
+    from todo.services.ai import registry
+
+    registry.warm_up()
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TodoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todo'
+
+    def ready(self):
+        # Nạp sẵn model AI để request đầu tiên không phải chờ joblib.load
+        if getattr(settings, "AI_WARMUP", False):
+            from .services.ai import registry
+            registry.warm_up()
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from todo.services.sync import TOMBSTONE_DAYS, prune_deletions
+
+
+class Command(BaseCommand):
+    help = (
+        "Dọn tombstone (DeletedTodo) cũ cho /api/todos/changes/. "
+        "Client có token cũ hơn mốc đã dọn sẽ phải đồng bộ lại từ đầu. "
+        "Chạy định kỳ (vd mỗi ngày bằng cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=TOMBSTONE_DAYS,
+            help=f"Giữ tombstone trong số ngày này (mặc định {TOMBSTONE_DAYS}).",
+        )
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(days=options["days"])
+        deleted = prune_deletions(older_than)
+        self.stdout.write(self.style.SUCCESS(f"Đã xoá {deleted} tombstone cũ hơn {options['days']} ngày."))
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.models import UserTodoStats
+from todo.services.stats import STATS_FIELDS, compute_all_stats, rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Tính lại bộ đếm UserTodoStats từ bảng Todo và báo cáo các dòng bị lệch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Chỉ kiểm tra sai lệch, không ghi lại (exit code 1 nếu có lệch).",
+        )
+        parser.add_argument(
+            "--user",
+            type=int,
+            help="Chỉ xử lý user có id này.",
+        )
+
+    def handle(self, *args, **options):
+        check_only = options["check"]
+        user_id = options.get("user")
+
+        expected = compute_all_stats()
+        existing = UserTodoStats.objects.all()
+        if user_id:
+            expected = {user_id: expected.get(user_id, {})}
+            existing = existing.filter(user_id=user_id)
+        existing = {stats.user_id: stats for stats in existing}
+
+        zero = {field: 0 for field in STATS_FIELDS}
+        # User có dòng thống kê nhưng không còn Todo nào -> phải về 0
+        for uid in existing:
+            expected.setdefault(uid, {})
+
+        # Chỉ tạo dòng cho user còn tồn tại
+        valid_users = set(
+            get_user_model().objects.filter(pk__in=expected.keys()).values_list("pk", flat=True)
+        )
+
+        to_create = []
+        to_update = []
+
+        for uid, values in expected.items():
+            if uid not in valid_users:
+                continue
+            values = {**zero, **values}
+            stats = existing.get(uid)
+            if stats is None:
+                if values["total"]:
+                    to_create.append(uid)
+                continue
+
+            diff = {
+                field: (getattr(stats, field), value)
+                for field, value in values.items()
+                if getattr(stats, field) != value
+            }
+            if diff:
+                detail = ", ".join(f"{f}: {old} -> {new}" for f, (old, new) in diff.items())
+                self.stdout.write(self.style.WARNING(f"user={uid} lệch: {detail}"))
+                to_update.append(uid)
+
+        if check_only:
+            if to_create or to_update:
+                raise CommandError(
+                    f"Có {len(to_create) + len(to_update)} user bị lệch "
+                    f"({len(to_create)} chưa có dòng thống kê)."
+                )
+            self.stdout.write(self.style.SUCCESS("Không có sai lệch."))
+            return
+
+        # Bảng so sánh ở trên đọc không khoá (chỉ để phát hiện lệch); ghi lại từng
+        # user dưới khoá dòng thống kê để không đè lên delta F() đang chạy song song
+        for uid in to_create + to_update:
+            rebuild_user_stats(uid)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Hoàn thành. Tạo {len(to_create)} dòng, sửa {len(to_update)} dòng bị lệch."
+            )
+        )
@@ -0,0 +1,212 @@
+import heapq
+import signal
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from todo.models import NotificationSetting, Todo
+from todo.services.reminders import (
+    due_reminders,
+    fire_time,
+    pending_reminders,
+    send_reminders,
+)
+
+
+class ReminderSchedule:
+    """
+    Hàng đợi thời điểm nhắc: heap (fire_at, setting_id) + dict setting_id -> fire_at.
+    Đổi lịch / huỷ chỉ cập nhật dict, phần tử cũ trong heap bị bỏ qua khi lấy ra.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._fire_at = {}
+
+    def __len__(self):
+        return len(self._fire_at)
+
+    def set(self, setting_id, fire_at):
+        if self._fire_at.get(setting_id) == fire_at:
+            return
+        self._fire_at[setting_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, setting_id))
+
+    def discard(self, setting_id):
+        self._fire_at.pop(setting_id, None)
+
+    def _drop_stale(self):
+        while self._heap:
+            fire_at, setting_id = self._heap[0]
+            if self._fire_at.get(setting_id) == fire_at:
+                return
+            heapq.heappop(self._heap)
+
+    def next_fire_at(self):
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Lấy ra mọi setting_id có fire_at <= now."""
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, setting_id = heapq.heappop(self._heap)
+            del self._fire_at[setting_id]
+            due.append(setting_id)
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy nền: gửi email nhắc đúng thời điểm due_at - reminder_minutes "
+        "(thay cho chạy send_reminders bằng cron)."
+    )
+
+    # Sau khi gửi lỗi, thử lại sau bấy nhiêu giây
+    RETRY_DELAY = timedelta(seconds=60)
+    # Lùi mốc poll một chút để không sót dòng commit chậm
+    POLL_OVERLAP = timedelta(seconds=2)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=10.0,
+            help="Số giây giữa 2 lần đọc các cấu hình nhắc vừa thay đổi.",
+        )
+        parser.add_argument(
+            "--lookahead",
+            type=int,
+            default=60,
+            help="Chỉ giữ trong bộ nhớ các lần nhắc trong N phút tới.",
+        )
+        parser.add_argument(
+            "--refresh-interval",
+            type=float,
+            default=300.0,
+            help="Số giây giữa 2 lần nạp lại toàn bộ cửa sổ lookahead.",
+        )
+
+    def handle(self, *args, **options):
+        self.poll_interval = options["poll_interval"]
+        self.lookahead = timedelta(minutes=options["lookahead"])
+        refresh_interval = options["refresh_interval"]
+        self.schedule = ReminderSchedule()
+
+        stop = threading.Event()
+
+        def _stop(signum, frame):
+            self.stdout.write("Nhận tín hiệu dừng, đang thoát...")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        # Lần nạp đầu lấy luôn các nhắc đã trễ trong lúc scheduler dừng
+        # (todo chưa quá hạn) -> gửi bù ngay ở vòng lặp đầu tiên
+        now = timezone.now()
+        self.last_poll = now
+        self.reload_window(now)
+        next_refresh = now + timedelta(seconds=refresh_interval)
+        next_poll = now + timedelta(seconds=self.poll_interval)
+        self.stdout.write(f"Scheduler đã chạy, {len(self.schedule)} lần nhắc trong hàng đợi.")
+
+        while not stop.is_set():
+            close_old_connections()
+            now = timezone.now()
+
+            if now >= next_refresh:
+                self.reload_window(now)
+                next_refresh = now + timedelta(seconds=refresh_interval)
+            elif now >= next_poll:
+                self.poll_changes(now)
+            if now >= next_poll:
+                next_poll = now + timedelta(seconds=self.poll_interval)
+
+            self.fire_due(now)
+
+            wake_at = next_poll
+            next_fire = self.schedule.next_fire_at()
+            if next_fire is not None and next_fire < wake_at:
+                wake_at = next_fire
+            stop.wait(max((wake_at - timezone.now()).total_seconds(), 0))
+
+        self.stdout.write(self.style.SUCCESS("Đã dừng scheduler."))
+
+    def _schedule_rows(self, rows, now):
+        horizon = now + self.lookahead
+        for setting_id, due_at, reminder_minutes in rows:
+            fire_at = fire_time(due_at, reminder_minutes)
+            if fire_at <= horizon:
+                self.schedule.set(setting_id, fire_at)
+            else:
+                self.schedule.discard(setting_id)
+
+    def reload_window(self, now):
+        """Nạp mọi lần nhắc trong [quá khứ, now + lookahead]."""
+        rows = (
+            pending_reminders(now)
+            .filter(remind_at__lte=now + self.lookahead)
+            .values_list("id", "todo__due_at", "reminder_minutes")
+        )
+        self._schedule_rows(rows, now)
+
+    def poll_changes(self, now):
+        """
+        Đọc các cấu hình thay đổi từ lần poll trước (theo updated_at), kể cả
+        cấu hình có todo vừa sửa (đổi hạn, đánh dấu xong...).
+        """
+        since = self.last_poll - self.POLL_OVERLAP
+        self.last_poll = now
+        changed = set(
+            NotificationSetting.objects.filter(updated_at__gt=since).values_list("id", flat=True)
+        )
+        changed.update(
+            NotificationSetting.objects.filter(
+                todo__in=Todo.objects.filter(updated_at__gt=since).values("id")
+            ).values_list("id", flat=True)
+        )
+        if not changed:
+            return
+        # Cấu hình không còn hợp lệ (tắt, đã gửi, todo xong/quá hạn...) bị bỏ khỏi lịch
+        for setting_id in changed:
+            self.schedule.discard(setting_id)
+        rows = pending_reminders(now).filter(id__in=changed).values_list(
+            "id", "todo__due_at", "reminder_minutes"
+        )
+        self._schedule_rows(rows, now)
+
+    def fire_due(self, now):
+        ids = self.schedule.pop_due(now)
+        if not ids:
+            return
+
+        def on_error(setting, e):
+            self.stderr.write(
+                self.style.ERROR(
+                    f"Lỗi gửi email cho user={setting.owner_id}, todo={setting.todo_id}: {e}"
+                )
+            )
+
+        # Kiểm tra lại trong DB ngay trước khi gửi (todo có thể vừa xong / đổi hạn)
+        sent, failed = send_reminders(
+            due_reminders(now).filter(id__in=ids), now, on_error=on_error
+        )
+        if sent or failed:
+            self.stdout.write(f"Đã gửi {sent} email nhắc, lỗi {failed} email.")
+
+        # Các cấu hình chưa gửi được (lỗi hoặc hạn vừa bị dời) được xếp lịch lại
+        rows = pending_reminders(now).filter(id__in=ids).values_list(
+            "id", "todo__due_at", "reminder_minutes"
+        )
+        for setting_id, due_at, reminder_minutes in rows:
+            fire_at = fire_time(due_at, reminder_minutes)
+            if fire_at <= now:
+                fire_at = now + self.RETRY_DELAY
+            if fire_at <= now + self.lookahead:
+                self.schedule.set(setting_id, fire_at)
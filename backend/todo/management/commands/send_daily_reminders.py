@@ -0,0 +1,60 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from todo.services.reminders import send_daily_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Gửi email tổng hợp nhắc hằng ngày (Todo.daily_reminder_time), "
+        "mỗi user 1 email cho các việc đến giờ nhắc."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lookback",
+            type=int,
+            default=5,
+            help="Xét cả các giờ nhắc trong N phút trước (bù khi cron chạy trễ).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Chạy liên tục, mỗi phút 1 lần.",
+        )
+
+    def handle(self, *args, **options):
+        lookback = options["lookback"]
+
+        def on_error(owner_id, e):
+            self.stderr.write(self.style.ERROR(f"Lỗi gửi email cho user={owner_id}: {e}"))
+
+        if not options["loop"]:
+            sent, failed = send_daily_reminders(lookback_minutes=lookback, on_error=on_error)
+            self.stdout.write(
+                self.style.SUCCESS(f"Hoàn thành. Đã gửi {sent} email, lỗi {failed} email.")
+            )
+            return
+
+        stop = threading.Event()
+
+        def _stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        while not stop.is_set():
+            close_old_connections()
+            sent, failed = send_daily_reminders(lookback_minutes=lookback, on_error=on_error)
+            if sent or failed:
+                self.stdout.write(f"Đã gửi {sent} email, lỗi {failed} email.")
+            # Ngủ đến đầu phút kế tiếp
+            now = timezone.now()
+            stop.wait(60 - now.second - now.microsecond / 1_000_000)
+
+        self.stdout.write(self.style.SUCCESS("Đã dừng."))
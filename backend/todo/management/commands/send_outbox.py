@@ -0,0 +1,58 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from todo.services.outbox import BATCH_SIZE, drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Gửi các email trong hàng đợi OutboundEmail (chạy 1 lần hoặc chạy nền với --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Số email gửi qua 1 kết nối SMTP.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Chạy liên tục, kiểm tra hàng đợi mỗi --interval giây.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Số giây nghỉ giữa 2 lần kiểm tra khi chạy --loop.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        if not options["loop"]:
+            sent, failed = drain_outbox(batch_size)
+            self.stdout.write(
+                self.style.SUCCESS(f"Hoàn thành. Đã gửi {sent} email, lỗi {failed} email.")
+            )
+            return
+
+        stop = threading.Event()
+
+        def _stop(signum, frame):
+            self.stdout.write("Nhận tín hiệu dừng, kết thúc sau lô hiện tại...")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        while not stop.is_set():
+            close_old_connections()
+            sent, failed = drain_outbox(batch_size)
+            if sent or failed:
+                self.stdout.write(f"Đã gửi {sent} email, lỗi {failed} email.")
+            stop.wait(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Đã dừng."))
@@ -1,99 +1,62 @@
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
+from django.db import connection
 from django.utils import timezone
 
-from todo.models import NotificationSetting
+from todo.services.reminders import REMINDER_BATCH_SIZE, due_reminders, send_reminders
 
 
 class Command(BaseCommand):
     help = "Gửi email nhắc nhở các công việc sắp đến hạn cho người dùng."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Số worker gửi song song (mỗi worker 1 kết nối DB + 1 kết nối SMTP).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REMINDER_BATCH_SIZE,
+            help="Số nhắc mỗi worker giữ chỗ trong 1 lô.",
+        )
+
     def handle(self, *args, **options):
         now = timezone.now()
-        qs = NotificationSetting.objects.select_related("todo", "owner")
-
-        sent_count = 0
-        skipped = 0
-
-        for setting in qs:
-            todo = setting.todo
-            user = setting.owner
-
-            if not setting.enabled:
-                skipped += 1
-                continue
-
-            if todo.completed:
-                skipped += 1
-                continue
-
-            if not todo.due_at:
-                skipped += 1
-                continue
-
-            # Không nhắc nếu đã quá hạn luôn
-            if now > todo.due_at:
-                skipped += 1
-                continue
-
-            minutes = setting.reminder_minutes or 60
-            remind_time = todo.due_at - timedelta(minutes=minutes)
+        workers = max(options["workers"], 1)
+        batch_size = options["batch_size"]
 
-            if now < remind_time:
-                skipped += 1
-                continue
-
-            if setting.last_sent_at is not None:
-                skipped += 1
-                continue
-
-            if not user.email:
-                skipped += 1
-                continue
-
-            subject = f"Nhắc nhở công việc: {todo.title}"
-            lines = [
-                f"Chào {user.get_username() or user.email},",
-                "",
-                "Đây là email nhắc nhở công việc bạn đã bật:",
-                f"- Tiêu đề: {todo.title}",
-                f"- Ưu tiên: {todo.priority}",
-            ]
-
-            local_due = timezone.localtime(todo.due_at)
-            lines.append(f"- Đến hạn lúc: {local_due.strftime('%d/%m/%Y %H:%M')}")
-
-            if todo.description:
-                lines.append("")
-                lines.append(f"Mô tả: {todo.description}")
-
-            lines.append("")
-            lines.append("Đây là email tự động từ hệ thống quản lý công việc.")
-            message = "\n".join(lines)
+        def on_error(setting, e):
+            self.stderr.write(
+                self.style.ERROR(
+                    f"Lỗi gửi email cho user={setting.owner_id}, todo={setting.todo_id}: {e}"
+                )
+            )
 
+        def run_worker(_):
             try:
-                send_mail(
-                    subject,
-                    message,
-                    None,
-                    [user.email],
-                    fail_silently=False,
+                # Chỉ các cấu hình đến giờ nhắc được đọc lên (lọc bằng SQL),
+                # các worker giữ chỗ theo lô nên không gửi trùng
+                return send_reminders(
+                    due_reminders(now), now, on_error=on_error, batch_size=batch_size
                 )
-                setting.last_sent_at = now
-                setting.save(update_fields=["last_sent_at"])
-                sent_count += 1
-            except Exception as e:
-                self.stderr.write(
-                    self.style.ERROR(
-                        f"Lỗi gửi email cho user={user.id}, todo={todo.id}: {e}"
-                    )
-                )
-                skipped += 1
-
+            finally:
+                if workers > 1:
+                    connection.close()
+
+        if workers == 1:
+            results = [run_worker(0)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(run_worker, range(workers)))
+
+        sent_count = sum(sent for sent, _ in results)
+        failed = sum(failed for _, failed in results)
         self.stdout.write(
             self.style.SUCCESS(
-                f"Hoàn thành. Đã gửi {sent_count} email, bỏ qua {skipped} cấu hình."
+                f"Hoàn thành. Đã gửi {sent_count} email, lỗi {failed} email."
             )
         )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0003_rename_todo_owner_completed_idx_todo_todo_owner_i_b3cdfd_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['user', 'date'], name='todo_calend_user_id_f1d0ba_idx'),
+        ),
+    ]
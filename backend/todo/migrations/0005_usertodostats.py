@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('todo', '0004_calendarevent_user_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTodoStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='todo_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('low_total', models.IntegerField(default=0)),
+                ('low_completed', models.IntegerField(default=0)),
+                ('medium_total', models.IntegerField(default=0)),
+                ('medium_completed', models.IntegerField(default=0)),
+                ('high_total', models.IntegerField(default=0)),
+                ('high_completed', models.IntegerField(default=0)),
+                ('urgent_total', models.IntegerField(default=0)),
+                ('urgent_completed', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Thống kê công việc',
+                'verbose_name_plural': 'Thống kê công việc',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0005_usertodostats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='todo_todo_owner_i_188505_idx'),
+        ),
+    ]
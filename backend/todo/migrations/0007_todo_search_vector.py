@@ -0,0 +1,54 @@
+# Full-text search cho Todo (chỉ áp dụng trên PostgreSQL)
+#
+# Cột search_vector là generated column (STORED) nên Postgres tự cập nhật khi
+# title/description/tags thay đổi, kể cả bulk_create/update(); cột này không
+# khai báo trong model nên ORM không bao giờ đọc/ghi nó.
+# Trên SQLite (chạy test) migration này không làm gì, SearchFilter dùng icontains.
+
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations
+
+FORWARD_SQL = [
+    # unaccent() chỉ là STABLE nên cần hàm bọc IMMUTABLE để dùng trong generated column
+    """
+    CREATE OR REPLACE FUNCTION todo_unaccent(text) RETURNS text AS $$
+        SELECT unaccent('unaccent'::regdictionary, $1)
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    """
+    ALTER TABLE todo_todo ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, todo_unaccent(coalesce(title, ''))), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, todo_unaccent(coalesce(tags, ''))), 'B') ||
+        setweight(to_tsvector('simple'::regconfig, todo_unaccent(coalesce(description, ''))), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX todo_todo_search_vector_gin ON todo_todo USING gin (search_vector)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS todo_todo_search_vector_gin",
+    "ALTER TABLE todo_todo DROP COLUMN IF EXISTS search_vector",
+    "DROP FUNCTION IF EXISTS todo_unaccent(text)",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0006_todo_owner_created_id_index'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0007_todo_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tên thẻ')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Thẻ',
+                'verbose_name_plural': 'Các thẻ',
+            },
+        ),
+        migrations.CreateModel(
+            name='TodoTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='todo_tags', to='todo.tag')),
+                ('todo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='todo_tags', to='todo.todo')),
+            ],
+            options={
+                'verbose_name': 'Thẻ của công việc',
+                'verbose_name_plural': 'Thẻ của công việc',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='unique_tag_per_user'),
+        ),
+        migrations.AddIndex(
+            model_name='todotag',
+            index=models.Index(fields=['tag', 'todo'], name='todo_todota_tag_id_e6480d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='todotag',
+            constraint=models.UniqueConstraint(fields=('todo', 'tag'), name='unique_tag_per_todo'),
+        ),
+    ]
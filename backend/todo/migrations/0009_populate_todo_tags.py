@@ -0,0 +1,76 @@
+# Chuyển chuỗi Todo.tags hiện có sang bảng Tag/TodoTag
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def _split(value, max_length):
+    names = []
+    for name in (value or "").split(","):
+        name = name.strip()[:max_length]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def populate_tags(apps, schema_editor):
+    Todo = apps.get_model("todo", "Todo")
+    Tag = apps.get_model("todo", "Tag")
+    TodoTag = apps.get_model("todo", "TodoTag")
+    max_length = Tag._meta.get_field("name").max_length
+
+    rows = (
+        Todo.objects.exclude(tags="")
+        .order_by("owner_id", "id")
+        .values_list("id", "owner_id", "tags")
+    )
+
+    def flush(batch):
+        owners = {owner_id for _, owner_id, _ in batch}
+        Tag.objects.bulk_create(
+            [
+                Tag(owner_id=owner_id, name=name)
+                for owner_id, name in {
+                    (owner_id, name) for _, owner_id, names in batch for name in names
+                }
+            ],
+            ignore_conflicts=True,
+        )
+        tag_ids = {
+            (owner_id, name): pk
+            for pk, owner_id, name in Tag.objects.filter(owner_id__in=owners).values_list(
+                "id", "owner_id", "name"
+            )
+        }
+        TodoTag.objects.bulk_create(
+            [
+                TodoTag(todo_id=todo_id, tag_id=tag_ids[(owner_id, name)])
+                for todo_id, owner_id, names in batch
+                for name in names
+            ],
+            ignore_conflicts=True,
+        )
+
+    batch = []
+    for todo_id, owner_id, tags in rows.iterator(chunk_size=BATCH_SIZE):
+        names = _split(tags, max_length)
+        if names:
+            batch.append((todo_id, owner_id, names))
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0008_tag_todotag'),
+    ]
+
+    operations = [
+        # Chiều ngược lại không cần làm gì: chuỗi Todo.tags vẫn được giữ nguyên
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
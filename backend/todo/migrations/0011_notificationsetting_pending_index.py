@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0010_outboundemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationsetting',
+            index=models.Index(condition=models.Q(('enabled', True), ('last_sent_at__isnull', True)), fields=['todo'], name='notif_pending_todo_idx'),
+        ),
+    ]
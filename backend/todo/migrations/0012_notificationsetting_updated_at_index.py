@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0011_notificationsetting_pending_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationsetting',
+            index=models.Index(fields=['updated_at'], name='todo_notifi_updated_03e5ac_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0012_notificationsetting_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentnotification',
+            name='kind',
+            field=models.CharField(choices=[('reminder', 'Nhắc trước hạn'), ('daily', 'Nhắc hằng ngày')], default='reminder', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='sentnotification',
+            name='sent_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='sentnotification',
+            name='notification_setting',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sent_notifications', to='todo.notificationsetting'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['daily_reminder_time', 'completed'], name='todo_todo_daily_r_7f932f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sentnotification',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'daily')), fields=('todo', 'sent_on'), name='unique_daily_reminder_per_day'),
+        ),
+    ]
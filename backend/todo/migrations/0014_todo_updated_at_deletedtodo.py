@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0013_daily_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedTodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_id', models.BigIntegerField(verbose_name='ID công việc')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Thời điểm xoá')),
+            ],
+            options={
+                'verbose_name': 'Công việc đã xoá',
+                'verbose_name_plural': 'Công việc đã xoá',
+            },
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', 'updated_at', 'id'], name='todo_todo_owner_i_8ca3fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['updated_at'], name='todo_todo_updated_61909c_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedtodo',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deleted_todos', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='deletedtodo',
+            index=models.Index(fields=['user', 'deleted_at', 'id'], name='todo_delete_user_id_f83045_idx'),
+        ),
+    ]
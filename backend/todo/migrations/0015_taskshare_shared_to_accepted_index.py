@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0014_todo_updated_at_deletedtodo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskshare',
+            index=models.Index(fields=['shared_to', 'accepted'], name='todo_tasksh_shared__b6f9ca_idx'),
+        ),
+    ]
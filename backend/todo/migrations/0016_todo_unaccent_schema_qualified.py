@@ -0,0 +1,57 @@
+# Hàm todo_unaccent (0007) gọi unaccent() không kèm schema: generated column
+# search_vector có thể lỗi khi pg_dump/restore hoặc khi search_path khác.
+# Tạo lại hàm (cùng chữ ký, CREATE OR REPLACE) với tên đầy đủ theo schema
+# chứa extension unaccent và cố định search_path của hàm.
+
+from django.db import migrations
+
+FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION todo_unaccent(text) RETURNS text AS $$
+    SELECT {schema}.unaccent('{schema}.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+SET search_path = pg_catalog, {schema}
+"""
+
+OLD_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION todo_unaccent(text) RETURNS text AS $$
+    SELECT unaccent('unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+"""
+
+
+def _unaccent_schema(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT n.nspname FROM pg_extension e
+            JOIN pg_namespace n ON n.oid = e.extnamespace
+            WHERE e.extname = 'unaccent'
+            """
+        )
+        row = cursor.fetchone()
+    return row[0] if row else "public"
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema = schema_editor.quote_name(_unaccent_schema(schema_editor))
+    # Kết quả hàm không đổi nên không cần tính lại cột search_vector đã lưu
+    schema_editor.execute(FUNCTION_SQL.format(schema=schema))
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(OLD_FUNCTION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0015_taskshare_shared_to_accepted_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
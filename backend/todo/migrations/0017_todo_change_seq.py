@@ -0,0 +1,135 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:42
+#
+# Mốc đồng bộ theo thứ tự commit cho /todos/changes/ (thay cho updated_at).
+# change_seq do trigger gán ở mọi INSERT/UPDATE nên không phụ thuộc code Python:
+# - PostgreSQL: txid của transaction ghi; services/sync.py chỉ đọc các dòng có
+#   change_seq < xmin của snapshot (mọi transaction nhỏ hơn đã kết thúc).
+# - SQLite (chạy test): bộ đếm tăng dần trong bảng todo_change_counter, SQLite chỉ
+#   cho 1 transaction ghi tại 1 thời điểm nên thứ tự gán = thứ tự commit.
+#   Lưu ý: SQLite tạo lại bảng khi ALTER nên migration sau có sửa todo_todo /
+#   todo_deletedtodo phải tạo lại trigger.
+
+from django.conf import settings
+from django.db import migrations, models
+
+PG_FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_set_change_seq() RETURNS trigger AS $$
+    BEGIN
+        NEW.change_seq := pg_current_xact_id()::text::bigint;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER todo_todo_change_seq BEFORE INSERT OR UPDATE ON todo_todo
+    FOR EACH ROW EXECUTE FUNCTION todo_set_change_seq()
+    """,
+    """
+    CREATE TRIGGER todo_deletedtodo_change_seq BEFORE INSERT ON todo_deletedtodo
+    FOR EACH ROW EXECUTE FUNCTION todo_set_change_seq()
+    """,
+]
+
+PG_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS todo_deletedtodo_change_seq ON todo_deletedtodo",
+    "DROP TRIGGER IF EXISTS todo_todo_change_seq ON todo_todo",
+    "DROP FUNCTION IF EXISTS todo_set_change_seq()",
+]
+
+SQLITE_TRIGGER_SQL = """
+    CREATE TRIGGER {table}_change_seq_{event} AFTER {event} ON {table}
+    BEGIN
+        UPDATE todo_change_counter SET value = value + 1;
+        UPDATE {table} SET change_seq = (SELECT value FROM todo_change_counter)
+        WHERE id = NEW.id;
+    END
+"""
+
+SQLITE_FORWARD_SQL = [
+    "CREATE TABLE todo_change_counter (value integer NOT NULL)",
+    "INSERT INTO todo_change_counter (value) VALUES (0)",
+    SQLITE_TRIGGER_SQL.format(table="todo_todo", event="INSERT"),
+    SQLITE_TRIGGER_SQL.format(table="todo_todo", event="UPDATE"),
+    SQLITE_TRIGGER_SQL.format(table="todo_deletedtodo", event="INSERT"),
+]
+
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS todo_deletedtodo_change_seq_INSERT",
+    "DROP TRIGGER IF EXISTS todo_todo_change_seq_UPDATE",
+    "DROP TRIGGER IF EXISTS todo_todo_change_seq_INSERT",
+    "DROP TABLE IF EXISTS todo_change_counter",
+]
+
+
+def _run(pg_statements, sqlite_statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor == "postgresql":
+            statements = pg_statements
+        elif vendor == "sqlite":
+            statements = sqlite_statements
+        else:
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0016_todo_unaccent_schema_qualified'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedTodoPrune',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pruned_seq', models.BigIntegerField(default=0, verbose_name='Mốc đã dọn')),
+                ('pruned_at', models.DateTimeField(auto_now=True, verbose_name='Lần dọn gần nhất')),
+            ],
+            options={
+                'verbose_name': 'Mốc dọn công việc đã xoá',
+                'verbose_name_plural': 'Mốc dọn công việc đã xoá',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='deletedtodo',
+            name='todo_delete_user_id_f83045_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='todo',
+            name='todo_todo_owner_i_8ca3fb_idx',
+        ),
+        migrations.AddField(
+            model_name='deletedtodo',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Mốc thay đổi'),
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Mốc thay đổi'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedtodo',
+            index=models.Index(fields=['user', 'change_seq', 'id'], name='todo_delete_user_id_502e3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedtodo',
+            index=models.Index(fields=['deleted_at'], name='todo_delete_deleted_a85d82_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', 'change_seq', 'id'], name='todo_todo_owner_i_1a24f8_idx'),
+        ),
+        # Sau các thao tác schema (SQLite tạo lại bảng khi thêm cột)
+        migrations.RunPython(
+            _run(PG_FORWARD_SQL, SQLITE_FORWARD_SQL),
+            _run(PG_REVERSE_SQL, SQLITE_REVERSE_SQL),
+        ),
+    ]
@@ -75,6 +75,13 @@ class Todo(models.Model):
     # Thêm trường nhắc hằng ngày
     daily_reminder_time = models.TimeField("Giờ nhắc hằng ngày", null=True, blank=True)
 
+    # Lưu ý: QuerySet.update()/bulk_update() không tự cập nhật auto_now,
+    # phải truyền updated_at khi sửa theo lô
+    updated_at = models.DateTimeField("Ngày cập nhật", auto_now=True)
+    # Mốc đồng bộ cho /todos/changes/, do trigger trong DB gán ở mọi INSERT/UPDATE
+    # (kể cả update()/bulk_update()), xem migration 0017 và services/sync.py
+    change_seq = models.BigIntegerField("Mốc thay đổi", default=0, editable=False)
+
 
     class Meta:
         verbose_name = "Công việc"
@@ -83,6 +90,14 @@ class Todo(models.Model):
             models.Index(fields=['owner', 'completed']),
             models.Index(fields=['owner', 'due_at']),
             models.Index(fields=['owner', 'priority']),
+            # Keyset pagination theo (created_at, id) của từng owner
+            models.Index(fields=['owner', '-created_at', '-id']),
+            # send_daily_reminders: todo chưa xong có giờ nhắc trong khoảng phút
+            models.Index(fields=['daily_reminder_time', 'completed']),
+            # /todos/changes/: đọc theo (change_seq, id) của từng owner
+            models.Index(fields=['owner', 'change_seq', 'id']),
+            # run_reminder_scheduler đọc các todo vừa thay đổi (mọi owner)
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
@@ -94,6 +109,90 @@ class Todo(models.Model):
         return self.due_at and self.due_at < timezone.now()
     
 
+class DeletedTodo(models.Model):
+    """
+    Dấu xoá (tombstone) cho /todos/changes/: mỗi todo bị xoá ghi 1 dòng
+    cho từng user đang thấy nó (owner + người nhận share đã chấp nhận).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deleted_todos')
+    todo_id = models.BigIntegerField("ID công việc")
+    deleted_at = models.DateTimeField("Thời điểm xoá", default=timezone.now)
+    # Gán bằng trigger như Todo.change_seq
+    change_seq = models.BigIntegerField("Mốc thay đổi", default=0, editable=False)
+
+    class Meta:
+        verbose_name = "Công việc đã xoá"
+        verbose_name_plural = "Công việc đã xoá"
+        indexes = [
+            models.Index(fields=['user', 'change_seq', 'id']),
+            # prune_deleted_todos xoá theo thời điểm
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"DeletedTodo(todo={self.todo_id}, user={self.user_id})"
+
+
+class DeletedTodoPrune(models.Model):
+    """
+    Mốc dọn tombstone (1 dòng): mọi DeletedTodo có change_seq <= pruned_seq đã
+    bị xoá, token /todos/changes/ chưa đọc tới mốc này phải đồng bộ lại từ đầu.
+    """
+    pruned_seq = models.BigIntegerField("Mốc đã dọn", default=0)
+    pruned_at = models.DateTimeField("Lần dọn gần nhất", auto_now=True)
+
+    class Meta:
+        verbose_name = "Mốc dọn công việc đã xoá"
+        verbose_name_plural = "Mốc dọn công việc đã xoá"
+
+    def __str__(self):
+        return f"DeletedTodoPrune(seq={self.pruned_seq})"
+
+
+class Tag(models.Model):
+    """
+    Thẻ của user. Todo.tags vẫn giữ chuỗi "a, b" để hiển thị/tìm kiếm,
+    còn TodoTag là bảng liên kết có index để lọc và đếm theo thẻ.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags')
+    name = models.CharField("Tên thẻ", max_length=100)
+
+    class Meta:
+        verbose_name = "Thẻ"
+        verbose_name_plural = "Các thẻ"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'name'],
+                name='unique_tag_per_user'
+            )
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class TodoTag(models.Model):
+    todo = models.ForeignKey(Todo, on_delete=models.CASCADE, related_name='todo_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='todo_tags')
+
+    class Meta:
+        verbose_name = "Thẻ của công việc"
+        verbose_name_plural = "Thẻ của công việc"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['todo', 'tag'],
+                name='unique_tag_per_todo'
+            )
+        ]
+        indexes = [
+            # Lọc theo thẻ: tag -> danh sách todo (index-only)
+            models.Index(fields=['tag', 'todo']),
+        ]
+
+    def __str__(self):
+        return f"TodoTag(todo={self.todo_id}, tag={self.tag_id})"
+
+
 # === 3. CHIA SẺ CÔNG VIỆC ===
 class TaskShare(models.Model):
     PERMISSION_CHOICES = (
@@ -135,6 +234,10 @@ class TaskShare(models.Model):
     class Meta:
         verbose_name = "Chia sẻ công việc"
         verbose_name_plural = "Chia sẻ công việc"
+        indexes = [
+            # Danh sách todo kèm task được share (?include_shared=1), shared-with-me
+            models.Index(fields=['shared_to', 'accepted']),
+        ]
 
     def __str__(self):
         return f"Share(task={self.task_id}, by={self.shared_by_id}, to={self.shared_to_id})"
@@ -198,6 +301,16 @@ class NotificationSetting(models.Model):
         unique_together = ("owner", "todo")
         verbose_name = "Cấu hình nhắc nhở"
         verbose_name_plural = "Cấu hình nhắc nhở"
+        indexes = [
+            # Partial index: send_reminders chỉ quét các cấu hình còn chờ gửi
+            models.Index(
+                fields=['todo'],
+                condition=models.Q(enabled=True, last_sent_at__isnull=True),
+                name='notif_pending_todo_idx',
+            ),
+            # run_reminder_scheduler đọc các dòng vừa thay đổi
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"NotificationSetting(todo={self.todo_id}, owner={self.owner_id})"
@@ -228,29 +341,134 @@ class CalendarEvent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Truy vấn lịch theo khoảng ngày của từng user
+            models.Index(fields=['user', 'date']),
+        ]
+
     def __str__(self):
         return f"CalendarEvent({self.todo.title} @ {self.date} {self.start_time})"
 
 
+class OutboundEmail(models.Model):
+    """
+    Hàng đợi email (outbox): request chỉ ghi 1 dòng trong cùng transaction
+    với dữ liệu, lệnh `manage.py send_outbox` gửi dần qua SMTP và tự retry.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Chờ gửi"),
+        (STATUS_SENDING, "Đang gửi"),
+        (STATUS_SENT, "Đã gửi"),
+        (STATUS_FAILED, "Lỗi"),
+    )
+
+    to_email = models.EmailField("Người nhận")
+    subject = models.CharField("Tiêu đề", max_length=255)
+    body = models.TextField("Nội dung")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # pending: thời điểm được gửi (lần đầu / retry); sending: hạn giữ chỗ của worker
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Email chờ gửi"
+        verbose_name_plural = "Email chờ gửi"
+        indexes = [
+            # Worker lấy các email đến lượt gửi
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"OutboundEmail(to={self.to_email}, status={self.status})"
+
+
 class SentNotification(models.Model):
+    """
+    Nhật ký thông báo đã gửi, đồng thời là "phiếu giữ chỗ": dòng được
+    INSERT trước khi gửi, ràng buộc unique đảm bảo mỗi thông báo chỉ gửi 1 lần.
+    - reminder: nhắc trước hạn theo NotificationSetting (1 lần cho mỗi cấu hình)
+    - daily: nhắc hằng ngày theo Todo.daily_reminder_time (1 lần mỗi ngày)
+    """
+    KIND_REMINDER = "reminder"
+    KIND_DAILY = "daily"
+    KIND_CHOICES = (
+        (KIND_REMINDER, "Nhắc trước hạn"),
+        (KIND_DAILY, "Nhắc hằng ngày"),
+    )
+
     notification_setting = models.ForeignKey(
         NotificationSetting,
         on_delete=models.CASCADE,
-        related_name='sent_notifications'
+        related_name='sent_notifications',
+        null=True,
+        blank=True,
     )
     todo = models.ForeignKey(
         Todo,
         on_delete=models.CASCADE,
         related_name='sent_notifications'
     )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_REMINDER)
+    # Ngày (giờ địa phương) của lần nhắc hằng ngày
+    sent_on = models.DateField(null=True, blank=True)
     sent_at = models.DateTimeField("Thời gian gửi", auto_now_add=True)
 
     class Meta:
         verbose_name = "Thông báo đã gửi"
         verbose_name_plural = "Thông báo đã gửi"
         unique_together = ('notification_setting', 'todo')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['todo', 'sent_on'],
+                condition=models.Q(kind='daily'),
+                name='unique_daily_reminder_per_day',
+            )
+        ]
 
     def __str__(self):
-        return f"{self.notification_setting} - {self.sent_at}"
+        return f"{self.notification_setting or self.todo_id} - {self.sent_at}"
+
+    
 
-    
\ No newline at end of file
+class UserTodoStats(models.Model):
+    """
+    Bộ đếm công việc theo user, được cập nhật ngay khi ghi (F() expressions)
+    để report progress / by-priority chỉ cần đọc 1 dòng theo khoá chính.
+    Lệnh `manage.py rebuild_todo_stats` tính lại và kiểm tra sai lệch.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="todo_stats",
+    )
+    # Dùng IntegerField (không Positive) để phép trừ F() không lỗi khi bị lệch tạm thời
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    low_total = models.IntegerField(default=0)
+    low_completed = models.IntegerField(default=0)
+    medium_total = models.IntegerField(default=0)
+    medium_completed = models.IntegerField(default=0)
+    high_total = models.IntegerField(default=0)
+    high_completed = models.IntegerField(default=0)
+    urgent_total = models.IntegerField(default=0)
+    urgent_completed = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Thống kê công việc"
+        verbose_name_plural = "Thống kê công việc"
+
+    def __str__(self):
+        return f"UserTodoStats(user={self.user_id}, total={self.total})"
@@ -40,6 +40,8 @@ class TagsField(serializers.Field):
 class TodoSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source="category.name", read_only=True)
     tags = TagsField(required=False)
+    # owner | edit | view (annotate trong TodoViewSet.get_queryset)
+    permission = serializers.SerializerMethodField()
 
     class Meta:
         model = Todo
@@ -57,15 +59,36 @@ class TodoSerializer(serializers.ModelSerializer):
             "category_name",
             "daily_reminder_time",
             "owner",
+            "updated_at",
+            "permission",
         ]
-        read_only_fields = ["owner", "created_at", "category_name"]
+        read_only_fields = ["owner", "created_at", "updated_at", "category_name"]
+
+    def get_permission(self, obj):
+        # Task vừa tạo (không qua queryset) luôn là của user hiện tại
+        return getattr(obj, "permission", "owner")
+
+    def validate_category(self, category):
+        # Category phải thuộc owner của todo (người nhận share quyền edit không
+        # được gắn category của mình / của người khác vào todo của owner)
+        if category is None:
+            return category
+        if self.instance is not None:
+            owner_id = self.instance.owner_id
+        else:
+            owner_id = self.context["request"].user.id
+        if category.owner_id != owner_id:
+            raise serializers.ValidationError("Danh mục không tồn tại")
+        return category
 
 
 # === SHARE TASK ===
 class TaskShareSerializer(serializers.ModelSerializer):
-    shared_by_username = serializers.SerializerMethodField(read_only=True)
-    shared_to_username = serializers.SerializerMethodField(read_only=True)
-    task_title = serializers.SerializerMethodField(read_only=True)
+    shared_by_username = serializers.CharField(source="shared_by.username", read_only=True)
+    shared_to_username = serializers.CharField(
+        source="shared_to.username", read_only=True, allow_null=True
+    )
+    task_title = serializers.CharField(source="task.title", read_only=True)
 
     class Meta:
         model = TaskShare
@@ -84,24 +107,6 @@ class TaskShareSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["shared_by", "created_at", "share_link"]
 
-    def get_shared_by_username(self, obj):
-        try:
-            return obj.shared_by.username if obj.shared_by else None
-        except Exception:
-            return None
-
-    def get_shared_to_username(self, obj):
-        try:
-            return obj.shared_to.username if obj.shared_to else None
-        except Exception:
-            return None
-
-    def get_task_title(self, obj):
-        try:
-            return obj.task.title if obj.task else None
-        except Exception:
-            return None
-
     def validate(self, attrs):
         request = self.context.get("request")
         user = getattr(request, "user", None)
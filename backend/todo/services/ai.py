@@ -1,28 +1,197 @@
 # todo/services/ai.py
+import hashlib
+import logging
+import math
 import os
 import joblib
 import threading
+import time
+from collections import OrderedDict
+
 import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
 
 # AI_MODEL_PATH: đường dẫn tới file model.pkl (train trước)
 DEFAULT_MODEL_PATH = os.getenv(
     "AI_MODEL_PATH",
     os.path.join(os.path.dirname(__file__), "model.pkl"),
 )
+DEFAULT_MODEL_NAME = "default"
+
+
+def _file_version(path, st):
+    """Hash ngắn của file model (đường dẫn + kích thước + mtime)."""
+    raw = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+class _LoadedModel:
+    __slots__ = ("model", "version", "mtime_ns", "size", "checked_at")
+
+    def __init__(self, model, version, st):
+        self.model = model
+        self.version = version
+        self.mtime_ns = st.st_mtime_ns
+        self.size = st.st_size
+        self.checked_at = time.monotonic()
+
+
+class ModelRegistry:
+    """
+    Danh sách model theo tên -> đường dẫn file .pkl.
+    - Load lười lần đầu (hoặc nạp sẵn bằng warm_up()).
+    - Tự load lại khi mtime/size của file đổi, kiểm tra tối đa mỗi
+      reload_interval giây, không cần restart worker. Nên ghi file mới
+      ra chỗ khác rồi rename đè để không đọc phải file đang ghi dở.
+    - mmap_mode="r": mảng numpy trong model được map từ file (read-only),
+      các worker cùng máy dùng chung page cache thay vì mỗi worker một bản.
+    """
+
+    def __init__(self, paths, reload_interval=30, mmap=True):
+        self._paths = dict(paths)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.reload_interval = reload_interval
+        self.mmap_mode = "r" if mmap else None
+
+    def register(self, name, path):
+        with self._lock:
+            self._paths[name] = path
+            self._entries.pop(name, None)
+
+    def names(self):
+        return list(self._paths)
+
+    def _load(self, name):
+        path = self._paths[name]
+        st = os.stat(path)
+        model = joblib.load(path, mmap_mode=self.mmap_mode)
+        logger.info("Đã load model AI '%s' từ %s", name, path)
+        return _LoadedModel(model, _file_version(path, st), st)
+
+    def get(self, name=DEFAULT_MODEL_NAME):
+        """Trả về (model, version). KeyError nếu tên chưa đăng ký."""
+        if name not in self._paths:
+            raise KeyError(name)
+
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() - entry.checked_at < self.reload_interval:
+            return entry.model, entry.version
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = self._load(name)
+            elif time.monotonic() - entry.checked_at >= self.reload_interval:
+                entry = self._refresh(name, entry)
+        return entry.model, entry.version
+
+    def _refresh(self, name, entry):
+        try:
+            st = os.stat(self._paths[name])
+            changed = (st.st_mtime_ns, st.st_size) != (entry.mtime_ns, entry.size)
+            if changed:
+                entry = self._entries[name] = self._load(name)
+        except Exception:
+            # File đang bị thay/hỏng: giữ model cũ, thử lại ở lần kiểm tra sau
+            logger.exception("Không load lại được model AI '%s'", name)
+        entry.checked_at = time.monotonic()
+        return entry
+
+    def warm_up(self, names=None):
+        """Load trước các model và chạy thử 1 lần predict (gọi khi worker khởi động)."""
+        for name in names or self.names():
+            try:
+                model, _ = self.get(name)
+                dummy = np.zeros((1, getattr(model, "n_features_in_", 4)))
+                if hasattr(model, "predict_proba"):
+                    model.predict_proba(dummy)
+                else:
+                    model.predict(dummy)
+            except Exception:
+                logger.exception("Warm-up model AI '%s' thất bại", name)
+
+
+# AI_MODELS trong settings: {"tên": "đường dẫn"}; "default" luôn trỏ AI_MODEL_PATH
+registry = ModelRegistry(
+    {
+        DEFAULT_MODEL_NAME: DEFAULT_MODEL_PATH,
+        **getattr(settings, "AI_MODELS", {}),
+    },
+    reload_interval=getattr(settings, "AI_MODEL_RELOAD_INTERVAL", 30),
+    mmap=getattr(settings, "AI_MODEL_MMAP", True),
+)
+
+
+# ============== Cache kết quả dự đoán ==============
+# Không gian đặc trưng rất nhỏ (thời lượng, priority, giờ bắt đầu, thứ) nên
+# phần lớn request trùng vector đặc trưng với request trước đó.
+# Key = vector đặc trưng đã lượng tử hoá + version model: sửa task làm đổi
+# đặc trưng -> key mới; đổi model.pkl -> version mới, cache cũ tự bỏ qua.
+
+# Bước làm tròn thời lượng (phút); model cũng dự đoán trên giá trị đã làm tròn
+DURATION_STEP_MIN = 5
+
+PREDICTION_CACHE_SIZE = getattr(settings, "AI_PREDICTION_CACHE_SIZE", 4096)
+# Alias trong settings.CACHES để chia sẻ kết quả giữa các worker (None = tắt)
+PREDICTION_SHARED_CACHE = getattr(settings, "AI_PREDICTION_SHARED_CACHE", None)
+PREDICTION_SHARED_TIMEOUT = 24 * 3600
+
+
+class _LRUCache:
+    """LRU giới hạn số phần tử, an toàn giữa các thread."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
 
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
 
-class _ModelHolder:
-    _instance = None
-    _lock = threading.Lock()
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
 
-    @classmethod
-    def get(cls, path=DEFAULT_MODEL_PATH):
-        """Singleton – chỉ load model một lần duy nhất."""
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = joblib.load(path)
-        return cls._instance
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_prediction_cache = _LRUCache(PREDICTION_CACHE_SIZE)
+
+
+def quantize_features(feats):
+    """[duration, priority, hour, weekday] -> tuple số nguyên dùng làm key."""
+    duration, priority, start_hour, day_of_week = feats
+    # inf/nan (vd "inf" từ request) không làm tròn được -> ValueError như dữ liệu sai kiểu
+    if not all(math.isfinite(float(v)) for v in feats):
+        raise ValueError("Đặc trưng phải là số hữu hạn")
+    step = DURATION_STEP_MIN
+    duration = int(round(float(duration) / step)) * step
+    return (duration, int(priority), int(start_hour), int(day_of_week))
+
+
+def _prediction_key(version, qfeats):
+    return f"ai_pred_{version}_" + "_".join(str(v) for v in qfeats)
+
+
+def clear_prediction_cache():
+    _prediction_cache.clear()
 
 
 def features_from_task(task, extra_data=None):
@@ -62,6 +231,92 @@ def features_from_task(task, extra_data=None):
     return [duration_min, priority, start_hour, day_of_week]
 
 
+def features_matrix(tasks, extra_data_list=None):
+    """
+    Ma trận đặc trưng (n, 4) cho nhiều task, dùng cho 1 lần gọi model.
+    extra_data_list: list dict tương ứng từng task (hoặc None).
+    """
+    if extra_data_list is None:
+        extra_data_list = [None] * len(tasks)
+    return np.array(
+        [features_from_task(task, extra) for task, extra in zip(tasks, extra_data_list)],
+        dtype=float,
+    ).reshape(-1, 4)
+
+
+def _run_model(model, feats):
+    """1 lần predict_proba cho ma trận feats -> list dict kết quả."""
+    if not hasattr(model, "predict_proba"):
+        preds = model.predict(feats)
+        return [{"on_time_prediction": int(p), "confidence": None} for p in preds]
+
+    proba = model.predict_proba(feats)
+    classes = list(model.classes_)
+    labels = np.asarray(model.classes_)[proba.argmax(axis=1)]
+    # Xác suất của lớp "đúng hạn" (1)
+    on_time_col = classes.index(1) if 1 in classes else proba.shape[1] - 1
+    confidences = proba[:, on_time_col]
+
+    return [
+        {
+            "on_time_prediction": int(label),
+            "confidence": round(float(prob), 2),
+        }
+        for label, prob in zip(labels, confidences)
+    ]
+
+
+def predict_tasks_on_time(tasks, extra_data_list=None, model_name=DEFAULT_MODEL_NAME):
+    """
+    Dự đoán theo lô, trả về list dict {"on_time_prediction", "confidence"}
+    theo đúng thứ tự đầu vào.
+    Thứ tự tra: LRU trong process -> cache dùng chung (nếu bật) -> model.
+    Các vector chưa có trong cache được dự đoán bằng 1 lần predict_proba.
+    """
+    if not tasks:
+        return []
+    model, version = registry.get(model_name)
+
+    keys = [
+        quantize_features(row)
+        for row in features_matrix(tasks, extra_data_list).tolist()
+    ]
+    found = {}
+    missing = []
+    for qfeats in dict.fromkeys(keys):
+        result = _prediction_cache.get((version, qfeats))
+        if result is None:
+            missing.append(qfeats)
+        else:
+            found[qfeats] = result
+
+    shared = caches[PREDICTION_SHARED_CACHE] if PREDICTION_SHARED_CACHE else None
+    if missing and shared is not None:
+        cache_keys = {_prediction_key(version, qfeats): qfeats for qfeats in missing}
+        for cache_key, result in shared.get_many(cache_keys.keys()).items():
+            qfeats = cache_keys[cache_key]
+            found[qfeats] = result
+            _prediction_cache.set((version, qfeats), result)
+        missing = [qfeats for qfeats in missing if qfeats not in found]
+
+    if missing:
+        results = _run_model(model, np.array(missing, dtype=float))
+        for qfeats, result in zip(missing, results):
+            found[qfeats] = result
+            _prediction_cache.set((version, qfeats), result)
+        if shared is not None:
+            shared.set_many(
+                {
+                    _prediction_key(version, qfeats): found[qfeats]
+                    for qfeats in missing
+                },
+                PREDICTION_SHARED_TIMEOUT,
+            )
+
+    # Trả bản sao để caller sửa dict không làm hỏng cache
+    return [dict(found[qfeats]) for qfeats in keys]
+
+
 def predict_task_on_time(task, extra_data=None, return_confidence=False):
     """
     Dự đoán task có hoàn thành đúng hạn không.
@@ -69,15 +324,7 @@ def predict_task_on_time(task, extra_data=None, return_confidence=False):
     - extra_data: dict JSON (khi test API)
     - return_confidence: bool → trả thêm xác suất nếu True
     """
-    model = _ModelHolder.get()
-    feats = [features_from_task(task, extra_data)]
-    pred = model.predict(feats)[0]
-
-    if return_confidence and hasattr(model, "predict_proba"):
-        prob = model.predict_proba(feats)[0][1]
-        return {
-            "on_time_prediction": int(pred),
-            "confidence": round(float(prob), 2),
-        }
-
-    return int(pred)
+    result = predict_tasks_on_time([task], [extra_data])[0]
+    if return_confidence and result["confidence"] is not None:
+        return result
+    return result["on_time_prediction"]
@@ -4,6 +4,77 @@ from datetime import datetime, timedelta
 from django.utils import timezone
 from collections import defaultdict
 
+_WHITESPACE_RE = re.compile(r"\s+")
+# Đầu dòng dạng gạch đầu dòng / đánh số / checkbox: "- ", "* ", "• ", "1. ", "2) ", "[ ] "
+_BULLET_RE = re.compile(r"^\s*(?:[-*•+]|\d{1,3}[.)]|\[[ xX]?\])\s+")
+_DATE_RE = re.compile(r"(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?")
+# Giờ cụ thể và thời lượng: gộp mọi mẫu vào 1 regex lookahead, quét message 1 lần.
+# Giờ xét theo thứ tự: "lúc 14h" > "14h" > "lúc 14" > "14:00" > "2pm";
+# thời lượng: "2 giờ" > "30 phút".
+# Các mẫu bắt đầu cùng 1 vị trí thì loại trừ nhau (khác ký tự ngay sau chữ số)
+# nên alternation không che mất mẫu nào – lần khớp đầu tiên của từng mẫu giống
+# hệt .search() riêng cho mẫu đó.
+_NUMBER_RE = re.compile(
+    r"(?=[\dlva])"  # chỉ thử alternation tại vị trí có thể bắt đầu 1 mẫu
+    r"(?=(?:lúc|vào)\s*(?P<with_h>\d{1,2})h"
+    r"|\b(?P<h>\d{1,2})h\b"
+    r"|(?:lúc|vào|at)\s*(?P<no_h>\d{1,2})\b"
+    r"|\b(?P<colon>\d{1,2}):\d{2}\b"
+    r"|\b(?P<ampm>\d{1,2}\s*(?:am|pm))\b"
+    r"|(?P<duration_hour>\d+)\s*(?:giờ|tiếng|hour)"
+    r"|(?P<duration_min>\d+)\s*(?:phút|minute|min))"
+)
+
+
+def _scan_numbers(message_lower):
+    """Trả về {loại mẫu: match đầu tiên của loại đó} sau 1 lần quét."""
+    first = {}
+    for match in _NUMBER_RE.finditer(message_lower):
+        # Mỗi nhánh có đúng 1 group có tên nên lastgroup chính là loại mẫu
+        first.setdefault(match.lastgroup, match)
+    return first
+
+
+class _KeywordScanner:
+    """
+    Tìm mọi từ khoá (của nhiều nhóm) có trong message chỉ với 1 lần quét,
+    kết quả tương đương kiểm tra `keyword in message` cho từng từ khoá.
+
+    Regex lookahead (?=(kw1|kw2|...)) khớp tại mọi vị trí (kể cả chồng lấn).
+    Từ khoá xếp dài trước nên tại mỗi vị trí regex trả về từ khoá dài nhất;
+    các từ khoá khác bắt đầu cùng vị trí đều là tiền tố của nó nên được gộp
+    sẵn vào bảng _info lúc khởi tạo.
+    """
+
+    def __init__(self, groups):
+        # groups: {tên nhóm: {từ khoá: hạng}} – hạng nhỏ hơn được ưu tiên
+        keywords = sorted(
+            {keyword for ranks in groups.values() for keyword in ranks},
+            key=len,
+            reverse=True,
+        )
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))"
+        )
+        self._info = {}
+        for keyword in keywords:
+            prefixes = [other for other in keywords if keyword.startswith(other)]
+            info = {}
+            for group, ranks in groups.items():
+                group_ranks = [ranks[other] for other in prefixes if other in ranks]
+                if group_ranks:
+                    info[group] = min(group_ranks)
+            self._info[keyword] = tuple(info.items())
+
+    def scan(self, text):
+        """Trả về {tên nhóm: hạng nhỏ nhất tìm thấy}; nhóm không có từ khoá nào thì vắng."""
+        best = {}
+        for match in self._pattern.finditer(text):
+            for group, rank in self._info[match.group(1)]:
+                if rank < best.get(group, rank + 1):
+                    best[group] = rank
+        return best
+
 
 class TaskChatbot:
     """
@@ -92,6 +163,73 @@ class TaskChatbot:
         "sunday": 6,
     }
     
+    # Từ khoá thời gian tương đối dùng khi parse deadline
+    # CRITICAL: "cho nay" = "hôm nay" (today)
+    EXTENDED_TIME_KEYWORDS = {
+        # Today variations (HIGHEST PRIORITY)
+        "cho nay": 0,
+        "hôm nay": 0,
+        "bây giờ": 0,
+        "ngay bây giờ": 0,
+        "ngay lập tức": 0,
+        "ngay": 0,
+        "today": 0,
+        "now": 0,
+        # Tomorrow
+        "ngày mai": 1,
+        "mai": 1,
+        "tomorrow": 1,
+        # Day after tomorrow
+        "ngày kia": 2,
+        "mốt": 2,
+        "2 ngày nữa": 2,
+        # This week
+        "3 ngày nữa": 3,
+        "4 ngày nữa": 4,
+        "5 ngày nữa": 5,
+        "tuần này": 3,
+        "cuối tuần": 5,
+        "weekend": 5,
+        # Next week
+        "tuần sau": 7,
+        "tuần tới": 7,
+        "next week": 7,
+        "2 tuần nữa": 14,
+        # This/next month
+        "tháng này": 15,
+        "tháng sau": 30,
+        "tháng tới": 30,
+        "next month": 30,
+    }
+
+    # Thứ tự xét priority: dấu hiệu khẩn cấp trước, rồi Urgent > High > Low
+    PRIORITY_ORDER = [
+        ("Urgent", ["!!!", "asap", "ngay lập tức", "cấp bách", "khẩn cấp"]),
+        ("Urgent", ["urgent", "khẩn", "gấp"]),
+        ("High", ["high", "cao", "quan trọng", "ưu tiên", "important"]),
+        ("Low", ["low", "thấp", "không gấp", "có thể", "optional"]),
+    ]
+
+    # Các pattern xoá khỏi title (compile 1 lần), áp dụng theo đúng thứ tự
+    TITLE_PATTERNS = [
+        # Remove action prefixes
+        (re.compile(r"^(tạo|thêm|add|create|new)\s+(task|công việc|việc)?\s*:?\s*", re.IGNORECASE), ""),
+        (re.compile(r"^(tôi|mình|em)\s+(cần|muốn|sẽ|phải)\s+", re.IGNORECASE), ""),
+        # Remove ALL time expressions (anywhere in string)
+        (re.compile(r"\d+h\s+(ngày mai|mai|hôm nay|cho nay)", re.IGNORECASE), " "),  # "8h ngày mai"
+        (re.compile(r"(ngày mai|mai|hôm nay|cho nay)\s+\d+h", re.IGNORECASE), " "),  # "ngày mai 8h"
+        (re.compile(r"\s+lúc\s+\d+[h:]?\d*", re.IGNORECASE), " "),  # "lúc 14h"
+        (re.compile(r"\s+vào\s+\d+[h:]?\d*", re.IGNORECASE), " "),  # "vào 9h"
+        (re.compile(r"\s+\d+h\d*\s*", re.IGNORECASE), " "),  # "8h", "14h30"
+        (re.compile(r"\s+(ngày mai|mai|hôm nay|cho nay|bây giờ|ngay)", re.IGNORECASE), " "),  # time keywords
+        (re.compile(r"\s+(today|tomorrow|now)", re.IGNORECASE), " "),
+        (re.compile(r"\s+(sáng|chiều|tối|đêm)", re.IGNORECASE), " "),
+        (re.compile(r"\s+\d+[:/]\d+(/\d+)?", re.IGNORECASE), " "),  # dates
+        (re.compile(r"\s+(thứ|chủ nhật)\s*(hai|ba|tư|năm|sáu|bảy|2|3|4|5|6|7)?", re.IGNORECASE), " "),
+        # Remove priority keywords
+        (re.compile(r"\s*(gấp|khẩn|urgent|quan trọng|ưu tiên|cấp bách|asap|important)\s*", re.IGNORECASE), " "),
+    ]
+
     # Action keywords để nhận diện intent
     ACTION_KEYWORDS = {
         "create": ["tạo", "thêm", "add", "create", "new", "làm", "viết"],
@@ -99,6 +237,16 @@ class TaskChatbot:
         "deadline": ["deadline", "hạn", "đến hạn", "due", "hoàn thành"],
     }
 
+    @staticmethod
+    def split_messages(text):
+        """Tách đoạn text nhiều dòng (danh sách gạch đầu dòng) thành từng message."""
+        messages = []
+        for line in (text or "").splitlines():
+            line = _BULLET_RE.sub("", line).strip()
+            if line:
+                messages.append(line)
+        return messages
+
     def parse_message(self, message):
         """
         Parse message thành task data - Enhanced version
@@ -113,10 +261,11 @@ class TaskChatbot:
         if len(message) > 500:
             message = message[:500]
 
-        # Extract components
+        # Extract components (từ khoá chỉ quét 1 lần cho cả priority và deadline)
+        found = self._scanner.scan(message_lower)
         title = self._extract_title(message)
-        priority = self._extract_priority(message_lower)
-        due_at = self._extract_due_date(message_lower)
+        priority = self._extract_priority(message_lower, found)
+        due_at = self._extract_due_date(message_lower, found)
         
         # Smart defaults
         if not title or len(title) < 2:
@@ -150,32 +299,11 @@ class TaskChatbot:
     def _extract_title(self, message):
         """Extract title - Remove ALL time/priority metadata"""
         title = message.strip()
-        
-        # Remove action prefixes
-        title = re.sub(r"^(tạo|thêm|add|create|new)\s+(task|công việc|việc)?\s*:?\s*", "", title, flags=re.IGNORECASE)
-        title = re.sub(r"^(tôi|mình|em)\s+(cần|muốn|sẽ|phải)\s+", "", title, flags=re.IGNORECASE)
-        
-        # Remove ALL time expressions (anywhere in string)
-        time_patterns = [
-            r"\d+h\s+(ngày mai|mai|hôm nay|cho nay)",  # "8h ngày mai"
-            r"(ngày mai|mai|hôm nay|cho nay)\s+\d+h",  # "ngày mai 8h"
-            r"\s+lúc\s+\d+[h:]?\d*",  # "lúc 14h"
-            r"\s+vào\s+\d+[h:]?\d*",  # "vào 9h"
-            r"\s+\d+h\d*\s*",  # "8h", "14h30"
-            r"\s+(ngày mai|mai|hôm nay|cho nay|bây giờ|ngay)",  # time keywords
-            r"\s+(today|tomorrow|now)",
-            r"\s+(sáng|chiều|tối|đêm)",
-            r"\s+\d+[:/]\d+(/\d+)?",  # dates
-            r"\s+(thứ|chủ nhật)\s*(hai|ba|tư|năm|sáu|bảy|2|3|4|5|6|7)?",
-        ]
-        for pattern in time_patterns:
-            title = re.sub(pattern, " ", title, flags=re.IGNORECASE)
-        
-        # Remove priority keywords
-        title = re.sub(r"\s*(gấp|khẩn|urgent|quan trọng|ưu tiên|cấp bách|asap|important)\s*", " ", title, flags=re.IGNORECASE)
-        
+        for pattern, replacement in self.TITLE_PATTERNS:
+            title = pattern.sub(replacement, title)
+
         # Clean whitespace
-        title = re.sub(r"\s+", " ", title).strip()
+        title = _WHITESPACE_RE.sub(" ", title).strip()
         
         # Validate
         if len(title) < 2:
@@ -183,123 +311,78 @@ class TaskChatbot:
         
         return title
 
-    def _extract_priority(self, message_lower):
+    def _extract_priority(self, message_lower, found=None):
         """Extract priority - Enhanced with context"""
-        # Check for urgent indicators first (highest priority)
-        urgent_indicators = ["!!!", "!!!", "asap", "ngay lập tức", "cấp bách", "khẩn cấp"]
-        for indicator in urgent_indicators:
-            if indicator in message_lower:
-                return "Urgent"
-        
-        # Check keywords by priority order
-        priority_order = [
-            ("Urgent", ["urgent", "khẩn", "gấp"]),
-            ("High", ["high", "cao", "quan trọng", "ưu tiên", "important"]),
-            ("Low", ["low", "thấp", "không gấp", "có thể", "optional"]),
-        ]
-        
-        for priority, keywords in priority_order:
-            for keyword in keywords:
-                if keyword in message_lower:
-                    return priority
-        
-        return "Medium"
+        if found is None:
+            found = self._scanner.scan(message_lower)
+        rank = found.get("priority")
+        if rank is None:
+            return "Medium"
+        return self.PRIORITY_ORDER[rank][0]
 
-    def _extract_duration(self, message_lower):
+    def _extract_duration(self, message_lower, numbers=None):
         """Extract duration (phút) từ message"""
-        hour_match = re.search(r"(\d+)\s*(giờ|tiếng|hour)", message_lower)
+        if numbers is None:
+            numbers = _scan_numbers(message_lower)
+
+        hour_match = numbers.get("duration_hour")
         if hour_match:
-            return int(hour_match.group(1)) * 60
+            return int(hour_match.group("duration_hour")) * 60
 
-        min_match = re.search(r"(\d+)\s*(phút|minute|min)", message_lower)
+        min_match = numbers.get("duration_min")
         if min_match:
-            return int(min_match.group(1))
+            return int(min_match.group("duration_min"))
 
         return 60  # Default 1 giờ
 
-    def _extract_due_date(self, message_lower):
+    def _extract_due_date(self, message_lower, found=None):
         """Extract due date - Smart time understanding"""
         now = timezone.now()
-        
-        # CRITICAL: "cho nay" = "hôm nay" (today)
-        # Extended time keywords - ORDER MATTERS (longer first)
-        extended_time = {
-            # Today variations (HIGHEST PRIORITY)
-            "cho nay": 0,
-            "hôm nay": 0,
-            "bây giờ": 0,
-            "ngay bây giờ": 0,
-            "ngay lập tức": 0,
-            "ngay": 0,
-            "today": 0,
-            "now": 0,
-            # Tomorrow
-            "ngày mai": 1,
-            "mai": 1,
-            "tomorrow": 1,
-            # Day after tomorrow
-            "ngày kia": 2,
-            "mốt": 2,
-            "2 ngày nữa": 2,
-            # This week
-            "3 ngày nữa": 3,
-            "4 ngày nữa": 4,
-            "5 ngày nữa": 5,
-            "tuần này": 3,
-            "cuối tuần": 5,
-            "weekend": 5,
-            # Next week
-            "tuần sau": 7,
-            "tuần tới": 7,
-            "next week": 7,
-            "2 tuần nữa": 14,
-            # This/next month
-            "tháng này": 15,
-            "tháng sau": 30,
-            "tháng tới": 30,
-            "next month": 30,
-        }
-        
+        if found is None:
+            found = self._scanner.scan(message_lower)
+
         # Check weekdays first (more specific)
-        for weekday_name, weekday_num in self.WEEKDAY_KEYWORDS.items():
-            if weekday_name in message_lower:
-                current_weekday = now.weekday()
-                days_ahead = weekday_num - current_weekday
-                
-                if days_ahead <= 0:
-                    days_ahead += 7
-                
-                due_date = now + timedelta(days=days_ahead)
-                hour = self._extract_hour(message_lower)
-                
-                due_date = due_date.replace(
-                    hour=hour if hour is not None else 23,
-                    minute=0 if hour is not None else 59,
-                    second=0,
-                    microsecond=0
-                )
-                return due_date
-        
-        # Check relative time (SORT BY LENGTH - longer phrases first)
-        for keyword, days_offset in sorted(extended_time.items(), key=lambda x: -len(x[0])):
-            if keyword in message_lower:
-                due_date = now + timedelta(days=days_offset)
-                hour = self._extract_hour(message_lower)
-                
-                # Smart hour defaults
-                if hour is not None:
-                    due_date = due_date.replace(hour=hour, minute=0, second=0, microsecond=0)
-                elif days_offset == 0:
-                    # Today: default to end of work day (18:00)
-                    due_date = due_date.replace(hour=18, minute=0, second=0, microsecond=0)
-                else:
-                    # Future: default to end of day
-                    due_date = due_date.replace(hour=23, minute=59, second=0, microsecond=0)
-                
-                return due_date
+        weekday_rank = found.get("weekday")
+        if weekday_rank is not None:
+            weekday_num = self._WEEKDAYS_BY_RANK[weekday_rank]
+            current_weekday = now.weekday()
+            days_ahead = weekday_num - current_weekday
+
+            if days_ahead <= 0:
+                days_ahead += 7
+
+            due_date = now + timedelta(days=days_ahead)
+            hour = self._extract_hour(message_lower)
+
+            due_date = due_date.replace(
+                hour=hour if hour is not None else 23,
+                minute=0 if hour is not None else 59,
+                second=0,
+                microsecond=0
+            )
+            return due_date
+
+        # Relative time (cụm dài được ưu tiên hơn cụm ngắn)
+        relative_rank = found.get("relative")
+        if relative_rank is not None:
+            days_offset = self._RELATIVE_DAYS_BY_RANK[relative_rank]
+            due_date = now + timedelta(days=days_offset)
+            hour = self._extract_hour(message_lower)
+
+            # Smart hour defaults
+            if hour is not None:
+                due_date = due_date.replace(hour=hour, minute=0, second=0, microsecond=0)
+            elif days_offset == 0:
+                # Today: default to end of work day (18:00)
+                due_date = due_date.replace(hour=18, minute=0, second=0, microsecond=0)
+            else:
+                # Future: default to end of day
+                due_date = due_date.replace(hour=23, minute=59, second=0, microsecond=0)
+
+            return due_date
         
         # Check specific date format
-        date_match = re.search(r"(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?", message_lower)
+        date_match = _DATE_RE.search(message_lower)
         if date_match:
             try:
                 day = int(date_match.group(1))
@@ -349,43 +432,26 @@ class TaskChatbot:
 
         return start
 
-    def _extract_hour(self, message_lower):
+    def _extract_hour(self, message_lower, numbers=None):
         """Extract giờ cụ thể - Fixed version"""
+        if numbers is None:
+            numbers = _scan_numbers(message_lower)
+
         # Priority order: more specific patterns first
-        
-        # Format: "lúc 14h", "vào 9h"
-        time_with_h = re.search(r"(lúc|vào)\s*(\d{1,2})h", message_lower)
-        if time_with_h:
-            hour = int(time_with_h.group(2))
-            if 0 <= hour <= 23:
-                return hour
-        
-        # Format: "14h", "9h" (standalone)
-        hour_h = re.search(r"\b(\d{1,2})h\b", message_lower)
-        if hour_h:
-            hour = int(hour_h.group(1))
-            if 0 <= hour <= 23:
-                return hour
-        
-        # Format: "lúc 14", "vào 9"
-        time_no_h = re.search(r"(lúc|vào|at)\s*(\d{1,2})\b", message_lower)
-        if time_no_h:
-            hour = int(time_no_h.group(2))
-            if 0 <= hour <= 23:
-                return hour
-        
-        # Format: "14:00", "9:30"
-        time_colon = re.search(r"\b(\d{1,2}):(\d{2})\b", message_lower)
-        if time_colon:
-            hour = int(time_colon.group(1))
-            if 0 <= hour <= 23:
-                return hour
-        
+        # ("lúc 14h" > "14h" > "lúc 14" > "14:00"); mẫu đầu tiên hợp lệ thắng
+        for kind in ("with_h", "h", "no_h", "colon"):
+            match = numbers.get(kind)
+            if match:
+                hour = int(match.group(kind))
+                if 0 <= hour <= 23:
+                    return hour
+
         # Format: "2pm", "9am"
-        ampm = re.search(r"\b(\d{1,2})\s*(am|pm)\b", message_lower)
+        ampm = numbers.get("ampm")
         if ampm:
-            hour = int(ampm.group(1))
-            period = ampm.group(2)
+            text = ampm.group("ampm")
+            hour = int(text[:-2])
+            period = text[-2:]
             
             if period == "pm" and hour < 12:
                 hour += 12
@@ -443,17 +509,35 @@ class TaskChatbot:
     
     def detect_intent(self, message):
         """Detect user intent from message"""
-        message_lower = message.lower()
-        
-        # Check for create intent
-        for keyword in self.ACTION_KEYWORDS["create"]:
-            if keyword in message_lower:
-                return "create"
-        
-        # Check for remind intent
-        for keyword in self.ACTION_KEYWORDS["remind"]:
-            if keyword in message_lower:
-                return "remind"
-        
-        # Default to create
-        return "create"
+        # "create" được ưu tiên hơn "remind"; không khớp gì thì mặc định "create"
+        rank = self._scanner.scan(message.lower()).get("intent")
+        if rank is None:
+            return "create"
+        return self._INTENTS_BY_RANK[rank]
+
+
+def _build_scanner(cls):
+    """Gộp mọi nhóm từ khoá của TaskChatbot thành 1 scanner (chạy 1 lần lúc import)."""
+    # Từ khoá thời gian tương đối: cụm dài trước, cùng độ dài giữ thứ tự khai báo
+    relative = sorted(cls.EXTENDED_TIME_KEYWORDS.items(), key=lambda item: -len(item[0]))
+    intents = list(cls.ACTION_KEYWORDS)[:2]  # create, remind
+
+    cls._RELATIVE_DAYS_BY_RANK = [days for _, days in relative]
+    cls._WEEKDAYS_BY_RANK = list(cls.WEEKDAY_KEYWORDS.values())
+    cls._INTENTS_BY_RANK = intents
+
+    groups = defaultdict(dict)
+    for rank, (_, keywords) in enumerate(cls.PRIORITY_ORDER):
+        for keyword in keywords:
+            groups["priority"].setdefault(keyword, rank)
+    for rank, keyword in enumerate(cls.WEEKDAY_KEYWORDS):
+        groups["weekday"][keyword] = rank
+    for rank, (keyword, _) in enumerate(relative):
+        groups["relative"][keyword] = rank
+    for rank, intent in enumerate(intents):
+        for keyword in cls.ACTION_KEYWORDS[intent]:
+            groups["intent"].setdefault(keyword, rank)
+    cls._scanner = _KeywordScanner(groups)
+
+
+_build_scanner(TaskChatbot)
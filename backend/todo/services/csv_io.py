@@ -0,0 +1,260 @@
+# todo/services/csv_io.py
+import csv
+from collections import Counter
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from ..models import Category, Todo
+from .stats import apply_stats_delta, todo_stats_delta
+from .tags import sync_todo_tags
+
+# Thứ tự cột trong file CSV (export và import dùng chung)
+CSV_COLUMNS = [
+    "id",
+    "title",
+    "description",
+    "category",
+    "priority",
+    "created_at",
+    "due_at",
+    "remind_at",
+    "completed",
+    "tags",
+    "daily_reminder_time",
+]
+
+# Các field tương ứng với CSV_COLUMNS khi lấy bằng values_list()
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "category__name",
+    "priority",
+    "created_at",
+    "due_at",
+    "remind_at",
+    "completed",
+    "tags",
+    "daily_reminder_time",
+]
+
+# Số dòng lấy mỗi lần từ server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """
+    Pseudo-buffer cho csv.writer: write() trả về luôn dòng vừa ghi,
+    nhờ vậy không cần giữ cả file trong io.StringIO.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        # datetime -> giờ địa phương, dạng ISO để import lại được
+        return timezone.localtime(value).isoformat()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def iter_todo_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Sinh từng dòng CSV từ queryset Todo (dòng đầu là header).
+    Dùng values_list() + iterator() nên không tạo model instance
+    và không nạp toàn bộ queryset vào bộ nhớ.
+    """
+    writer = csv.writer(_Echo())
+    # BOM để Excel đọc đúng tiếng Việt
+    yield "\ufeff" + writer.writerow(CSV_COLUMNS)
+
+    rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield writer.writerow([_format_value(v) for v in row])
+
+
+# ================== IMPORT ==================
+
+# Số Todo mỗi lần bulk_create
+IMPORT_BATCH_SIZE = 500
+# Chỉ trả về tối đa chừng này lỗi chi tiết (tránh response quá lớn)
+MAX_REPORTED_ERRORS = 200
+
+# Giới hạn độ dài lấy từ model: vượt quá sẽ gây DataError và huỷ cả transaction
+TITLE_MAX_LENGTH = Todo._meta.get_field("title").max_length
+TAGS_MAX_LENGTH = Todo._meta.get_field("tags").max_length
+CATEGORY_MAX_LENGTH = Category._meta.get_field("name").max_length
+
+_PRIORITY_LOOKUP = {
+    "low": "Low",
+    "thấp": "Low",
+    "medium": "Medium",
+    "trung bình": "Medium",
+    "high": "High",
+    "cao": "High",
+    "urgent": "Urgent",
+    "khẩn cấp": "Urgent",
+}
+_TRUE_VALUES = {"1", "true", "yes", "y", "x", "có", "đã xong"}
+_FALSE_VALUES = {"", "0", "false", "no", "n", "không"}
+
+
+def _parse_datetime_cell(value):
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        dt = parse_datetime(value)
+        if dt is None:
+            d = parse_date(value)
+            dt = datetime(d.year, d.month, d.day, 23, 59) if d else None
+    except ValueError:
+        dt = None
+    if dt is None:
+        raise ValueError("Sai định dạng ngày giờ (dùng ISO, vd 2025-12-31T18:00)")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def parse_todo_row(
+    row,
+    max_title_length=TITLE_MAX_LENGTH,
+    max_tags_length=TAGS_MAX_LENGTH,
+    max_category_length=CATEGORY_MAX_LENGTH,
+):
+    """
+    Validate nhẹ một dòng CSV (dict từ csv.DictReader) thay vì dựng
+    TodoSerializer cho từng dòng.
+    Trả về (data, errors): data là dict field của Todo (category là tên),
+    errors là dict {cột: thông báo lỗi}.
+    """
+    data = {}
+    errors = {}
+
+    title = (row.get("title") or "").strip()
+    if not title:
+        errors["title"] = "Tiêu đề là bắt buộc"
+    elif len(title) > max_title_length:
+        errors["title"] = f"Tiêu đề tối đa {max_title_length} ký tự"
+    data["title"] = title
+
+    data["description"] = (row.get("description") or "").strip()
+    data["category"] = (row.get("category") or "").strip()
+    if len(data["category"]) > max_category_length:
+        errors["category"] = f"Tên danh mục tối đa {max_category_length} ký tự"
+
+    raw_priority = (row.get("priority") or "").strip().lower()
+    if not raw_priority:
+        data["priority"] = "Medium"
+    elif raw_priority in _PRIORITY_LOOKUP:
+        data["priority"] = _PRIORITY_LOOKUP[raw_priority]
+    else:
+        errors["priority"] = "Mức ưu tiên không hợp lệ (Low/Medium/High/Urgent)"
+
+    for field in ("due_at", "remind_at"):
+        try:
+            data[field] = _parse_datetime_cell(row.get(field) or "")
+        except ValueError as e:
+            errors[field] = str(e)
+
+    raw_completed = (row.get("completed") or "").strip().lower()
+    if raw_completed in _TRUE_VALUES:
+        data["completed"] = True
+    elif raw_completed in _FALSE_VALUES:
+        data["completed"] = False
+    else:
+        errors["completed"] = "Giá trị completed không hợp lệ (true/false)"
+
+    # Chuẩn hoá tags giống TagsField: "a, b, c"
+    raw_tags = row.get("tags") or ""
+    tags = ", ".join(t.strip() for t in raw_tags.replace(";", ",").split(",") if t.strip())
+    if len(tags) > max_tags_length:
+        errors["tags"] = f"Tags tối đa {max_tags_length} ký tự"
+    data["tags"] = tags
+
+    raw_time = (row.get("daily_reminder_time") or "").strip()
+    data["daily_reminder_time"] = None
+    if raw_time:
+        try:
+            data["daily_reminder_time"] = parse_time(raw_time)
+        except ValueError:
+            pass
+        if data["daily_reminder_time"] is None:
+            errors["daily_reminder_time"] = "Sai định dạng giờ (HH:MM)"
+
+    return data, errors
+
+
+def _insert_batch(batch, batch_size):
+    Todo.objects.bulk_create(batch, batch_size=batch_size)
+    # bulk_create trả về pk trên PostgreSQL/SQLite nên gắn thẻ được ngay
+    sync_todo_tags([todo for todo in batch if todo.tags])
+    return len(batch)
+
+
+def import_todos_csv(owner, text_stream, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Đọc CSV từ text_stream (đọc dần, không nạp cả file) và tạo Todo cho owner.
+    - Category được resolve qua 1 dict dựng sẵn {tên: id}; tên mới sẽ được tạo.
+    - Insert theo lô bằng bulk_create, tất cả nằm trong 1 transaction.
+    Trả về {"created": n, "failed": m, "errors": [{"row": i, "errors": {...}}]}.
+    """
+    reader = csv.DictReader(text_stream)
+    if not reader.fieldnames or "title" not in [
+        (name or "").strip().lower() for name in reader.fieldnames
+    ]:
+        raise ValueError("File CSV phải có header và cột 'title'")
+    reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames]
+
+    categories = {
+        name.lower(): pk
+        for pk, name in Category.objects.filter(owner=owner).values_list("id", "name")
+    }
+
+    created = 0
+    failed = 0
+    errors = []
+    batch = []
+    stats_delta = Counter()
+
+    with transaction.atomic():
+        # Dòng 1 là header nên dữ liệu bắt đầu từ dòng 2
+        for line_no, row in enumerate(reader, start=2):
+            data, row_errors = parse_todo_row(row)
+            if row_errors:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": line_no, "errors": row_errors})
+                continue
+
+            category_name = data.pop("category")
+            category_id = None
+            if category_name:
+                category_id = categories.get(category_name.lower())
+                if category_id is None:
+                    category_id = Category.objects.create(owner=owner, name=category_name).id
+                    categories[category_name.lower()] = category_id
+
+            batch.append(Todo(owner=owner, category_id=category_id, **data))
+            stats_delta.update(todo_stats_delta(data["priority"], data["completed"]))
+            if len(batch) >= batch_size:
+                created += _insert_batch(batch, batch_size)
+                batch = []
+
+        if batch:
+            created += _insert_batch(batch, batch_size)
+
+        # Cập nhật bộ đếm thống kê 1 lần cho cả file
+        if created:
+            apply_stats_delta(owner.id, stats_delta)
+
+    return {"created": created, "failed": failed, "errors": errors}
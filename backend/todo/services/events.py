@@ -0,0 +1,211 @@
+# todo/services/events.py
+"""
+Pub/sub sự kiện thay đổi todo cho GET /api/todos/stream/ (SSE).
+
+Sự kiện gọn: {"type": "created" | "updated" | "deleted" | "resync", "ids": [...]},
+client tự lấy dữ liệu chi tiết qua /api/todos/changes/.
+
+Backend fan-out (settings.TODO_EVENTS_BACKEND):
+- "local": hàng đợi asyncio trong process, chỉ phục vụ kết nối cùng process
+  (runserver / 1 worker ASGI); chạy nhiều worker với "local" bị từ chối
+  (check_events_backend).
+- "redis": publish qua Redis pub/sub, mỗi process có 1 task lắng nghe chung
+  và phân phát lại cho các kết nối của process đó (nhiều worker).
+
+Mỗi kết nối có hàng đợi giới hạn: client đọc chậm bị bỏ các sự kiện đang chờ
+và nhận 1 sự kiện "resync" (đồng bộ lại bằng /todos/changes/).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = getattr(settings, "TODO_EVENTS_QUEUE_SIZE", 100)
+RESYNC_EVENT = {"type": "resync", "ids": []}
+
+
+class Subscription:
+    """1 kết nối SSE: hàng đợi gắn với event loop đang phục vụ kết nối."""
+
+    def __init__(self, user_id, loop, maxsize=QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def push(self, event):
+        # Luôn chạy trong self.loop (qua call_soon_threadsafe)
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroker:
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """Gọi trong event loop của kết nối."""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def dispatch(self, user_id, event):
+        """Đẩy sự kiện tới các kết nối của user trong process này (gọi được từ mọi thread)."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # Event loop đã đóng: kết nối không còn
+                self.unsubscribe(subscription)
+
+    def dispatch_all(self, event):
+        with self._lock:
+            user_ids = list(self._subscribers)
+        for user_id in user_ids:
+            self.dispatch(user_id, event)
+
+    def publish(self, user_id, event):
+        self.dispatch(user_id, event)
+
+
+class RedisBroker(LocalBroker):
+    """Fan-out giữa các process qua Redis pub/sub (cần package "redis")."""
+
+    channel_prefix = "todo_events:"
+    reconnect_delay = 1.0
+
+    def __init__(self, url, queue_size=QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.url = url
+        self._client = None
+        self._listeners = {}
+
+    def publish(self, user_id, event):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        try:
+            self._client.publish(f"{self.channel_prefix}{user_id}", json.dumps(event))
+        except Exception:
+            logger.exception("Không publish được sự kiện todo lên Redis")
+
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        # 1 task lắng nghe cho mỗi event loop (mỗi process ASGI có 1 loop)
+        listener = self._listeners.get(subscription.loop)
+        if listener is None or listener.done():
+            self._listeners[subscription.loop] = subscription.loop.create_task(self._listen())
+        return subscription
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        pattern = f"{self.channel_prefix}*"
+        while True:
+            client = aioredis.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(pattern)
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    user_id = int(channel[len(self.channel_prefix):])
+                    self.dispatch(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Mất kết nối Redis pub/sub, thử lại")
+                # Có thể đã lỡ sự kiện trong lúc mất kết nối
+                self.dispatch_all(RESYNC_EVENT)
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def check_events_backend(workers):
+    """
+    Backend "local" chỉ phát sự kiện trong 1 process: với nhiều worker, client
+    nối vào worker khác sẽ không bao giờ nhận được sự kiện -> báo lỗi ngay.
+    Gọi từ gunicorn.conf.py (on_starting) và khi tạo broker (WEB_CONCURRENCY).
+    """
+    backend = getattr(settings, "TODO_EVENTS_BACKEND", "local")
+    if backend != "redis" and workers > 1:
+        raise ImproperlyConfigured(
+            f"TODO_EVENTS_BACKEND='{backend}' chỉ dùng được với 1 worker "
+            f"(đang cấu hình {workers}): set REDIS_URL / TODO_EVENTS_BACKEND=redis"
+        )
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                # gunicorn / uvicorn đều đọc số worker mặc định từ WEB_CONCURRENCY
+                check_events_backend(int(os.environ.get("WEB_CONCURRENCY", "1")))
+                backend = getattr(settings, "TODO_EVENTS_BACKEND", "local")
+                if backend == "redis":
+                    _broker = RedisBroker(settings.REDIS_URL)
+                else:
+                    _broker = LocalBroker()
+    return _broker
+
+
+def publish_todo_events(event_type, audience):
+    """
+    audience: tập (todo_id, user_id) (xem sync.todo_audience). Gom id theo user
+    và chỉ publish sau khi transaction hiện tại commit.
+    """
+    ids_by_user = defaultdict(list)
+    for todo_id, user_id in audience:
+        ids_by_user[user_id].append(todo_id)
+    if not ids_by_user:
+        return
+
+    def publish():
+        broker = get_broker()
+        for user_id, ids in ids_by_user.items():
+            broker.publish(user_id, {"type": event_type, "ids": sorted(ids)})
+
+    transaction.on_commit(publish)
+
+
+def publish_resync(user_id):
+    """Báo client đồng bộ lại (vd sau khi import CSV nhiều task)."""
+    transaction.on_commit(lambda: get_broker().publish(user_id, RESYNC_EVENT))
@@ -0,0 +1,137 @@
+# todo/services/outbox.py
+"""
+Outbox email: ghi OutboundEmail trong transaction của request, worker
+(`manage.py send_outbox`) gửi theo lô qua 1 kết nối SMTP và retry có backoff.
+
+Worker "giữ chỗ" lô email bằng cách chuyển sang status sending và đặt
+next_attempt_at = hạn giữ chỗ; nếu worker chết giữa chừng, các email đó
+tự được worker khác lấy lại sau khi hết hạn.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import OutboundEmail
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5)
+# Thời gian giữ chỗ 1 lô (giây), phải lớn hơn thời gian gửi 1 lô
+CLAIM_TIMEOUT = 300
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+
+def enqueue_email(subject, body, to_email):
+    """Xếp 1 email vào hàng đợi (gọi bên trong transaction của request)."""
+    return OutboundEmail.objects.create(
+        to_email=to_email,
+        subject=subject[:255],
+        body=body,
+    )
+
+
+def retry_delay(attempts):
+    """Backoff luỹ thừa: 1, 2, 4, ... phút, tối đa 1 giờ."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_batch(limit=BATCH_SIZE):
+    """
+    Lấy tối đa `limit` email đến lượt gửi và đánh dấu sending.
+    Trên PostgreSQL dùng SKIP LOCKED nên nhiều worker chạy song song
+    không lấy trùng email.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[OutboundEmail.STATUS_PENDING, OutboundEmail.STATUS_SENDING],
+                next_attempt_at__lte=now,
+            )
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        OutboundEmail.objects.filter(id__in=ids).update(
+            status=OutboundEmail.STATUS_SENDING,
+            next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT),
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by("id"))
+
+
+def send_batch(emails, connection=None):
+    """
+    Gửi 1 lô qua cùng 1 kết nối SMTP, cập nhật trạng thái theo lô.
+    Trả về (số đã gửi, số lỗi).
+    """
+    if not emails:
+        return 0, 0
+
+    connection = connection or get_connection(fail_silently=False)
+    sent_ids = []
+    failed = []
+    try:
+        connection.open()
+    except Exception as e:
+        # Không kết nối được SMTP: cả lô tính là 1 lần thử lỗi
+        failed = [(email, repr(e)) for email in emails]
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject,
+                    email.body,
+                    None,
+                    [email.to_email],
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                    sent_ids.append(email.id)
+                except Exception as e:
+                    failed.append((email, repr(e)))
+        finally:
+            connection.close()
+
+    now = timezone.now()
+    if sent_ids:
+        OutboundEmail.objects.filter(id__in=sent_ids).update(
+            status=OutboundEmail.STATUS_SENT,
+            sent_at=now,
+            attempts=F("attempts") + 1,
+            last_error="",
+        )
+    for email, error in failed:
+        email.attempts += 1
+        email.last_error = error[:1000]
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = OutboundEmail.STATUS_FAILED
+        else:
+            email.status = OutboundEmail.STATUS_PENDING
+            email.next_attempt_at = now + retry_delay(email.attempts)
+    if failed:
+        OutboundEmail.objects.bulk_update(
+            [email for email, _ in failed],
+            ["attempts", "last_error", "status", "next_attempt_at"],
+        )
+    return len(sent_ids), len(failed)
+
+
+def drain_outbox(batch_size=BATCH_SIZE, max_batches=None):
+    """Gửi đến khi hết email đến lượt (hoặc đủ max_batches lô). Trả về (sent, failed)."""
+    total_sent = total_failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        sent, failed = send_batch(emails)
+        total_sent += sent
+        total_failed += failed
+        batches += 1
+    return total_sent, total_failed
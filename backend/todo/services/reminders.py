@@ -0,0 +1,355 @@
+# todo/services/reminders.py
+"""
+Chọn các NotificationSetting đến giờ nhắc bằng 1 câu SQL và gửi email nhắc.
+
+Điều kiện nhắc (giống logic cũ của send_reminders):
+  enabled, chưa gửi (last_sent_at IS NULL), todo chưa xong,
+  now < due_at và due_at - reminder_minutes <= now (reminder_minutes = 0 -> 60 phút).
+"""
+from datetime import time, timedelta
+from itertools import groupby
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import (
+    Case,
+    DurationField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef,
+    Value,
+    When,
+)
+from django.utils import timezone
+
+from ..models import NotificationSetting, SentNotification, Todo
+
+DEFAULT_REMINDER_MINUTES = 60
+# Số cấu hình nhắc giữ chỗ mỗi lô
+REMINDER_BATCH_SIZE = 200
+ITERATOR_CHUNK_SIZE = 500
+# Số todo giữ chỗ / gửi mỗi lô của nhắc hằng ngày
+DAILY_BATCH_SIZE = 500
+
+
+def reminder_offset():
+    """Khoảng thời gian nhắc trước hạn, tính trong SQL."""
+    minutes = Case(
+        When(reminder_minutes=0, then=Value(DEFAULT_REMINDER_MINUTES)),
+        default=F("reminder_minutes"),
+        output_field=IntegerField(),
+    )
+    return ExpressionWrapper(
+        minutes * Value(timedelta(minutes=1)),
+        output_field=DurationField(),
+    )
+
+
+def fire_time(due_at, reminder_minutes):
+    """Thời điểm cần gửi nhắc của 1 cấu hình (tính trong Python)."""
+    return due_at - timedelta(minutes=reminder_minutes or DEFAULT_REMINDER_MINUTES)
+
+
+def pending_reminders(now=None):
+    """Các cấu hình còn chờ nhắc: đang bật, chưa gửi, todo chưa xong và chưa quá hạn."""
+    now = now or timezone.now()
+    return (
+        NotificationSetting.objects.filter(
+            enabled=True,
+            last_sent_at__isnull=True,
+            todo__completed=False,
+            todo__due_at__gt=now,
+        )
+        .exclude(owner__email="")
+        .exclude(owner__email__isnull=True)
+        .alias(remind_at=F("todo__due_at") - reminder_offset())
+        .order_by()
+    )
+
+
+def due_reminders(now=None, until=None):
+    """
+    Queryset các cấu hình cần gửi tại thời điểm now
+    (until: lấy luôn các cấu hình đến giờ nhắc trước thời điểm này).
+    """
+    now = now or timezone.now()
+    return (
+        pending_reminders(now)
+        .filter(remind_at__lte=until or now)
+        .select_related("todo", "owner")
+    )
+
+
+def build_reminder_email(setting, connection=None):
+    todo = setting.todo
+    user = setting.owner
+
+    subject = f"Nhắc nhở công việc: {todo.title}"
+    lines = [
+        f"Chào {user.get_username() or user.email},",
+        "",
+        "Đây là email nhắc nhở công việc bạn đã bật:",
+        f"- Tiêu đề: {todo.title}",
+        f"- Ưu tiên: {todo.priority}",
+    ]
+
+    local_due = timezone.localtime(todo.due_at)
+    lines.append(f"- Đến hạn lúc: {local_due.strftime('%d/%m/%Y %H:%M')}")
+
+    if todo.description:
+        lines.append("")
+        lines.append(f"Mô tả: {todo.description}")
+
+    lines.append("")
+    lines.append("Đây là email tự động từ hệ thống quản lý công việc.")
+
+    return EmailMessage(
+        subject,
+        "\n".join(lines),
+        None,
+        [user.email],
+        connection=connection,
+    )
+
+
+# ============== Giữ chỗ qua SentNotification ==============
+
+def claim_notifications(rows, kind, sent_on=None):
+    """
+    Giữ chỗ gửi bằng cách INSERT trước vào SentNotification.
+    rows: list (todo_id, notification_setting_id hoặc None).
+    1 câu INSERT ... ON CONFLICT DO NOTHING RETURNING cho cả lô: dòng nào
+    vi phạm unique (đã gửi / process khác đang gửi) bị bỏ qua, kết quả là
+    tập (todo_id, notification_setting_id) mà lần chạy này được phép gửi.
+    """
+    if not rows:
+        return set()
+    ops = db_connection.ops
+    table = ops.quote_name(SentNotification._meta.db_table)
+    sent_at = ops.adapt_datetimefield_value(timezone.now())
+    sent_on = ops.adapt_datefield_value(sent_on)
+
+    claimed = set()
+    for start in range(0, len(rows), DAILY_BATCH_SIZE):
+        chunk = rows[start:start + DAILY_BATCH_SIZE]
+        params = []
+        for todo_id, setting_id in chunk:
+            params += [todo_id, setting_id, kind, sent_on, sent_at]
+        sql = (
+            f"INSERT INTO {table} (todo_id, notification_setting_id, kind, sent_on, sent_at) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(chunk))} "
+            "ON CONFLICT DO NOTHING RETURNING todo_id, notification_setting_id"
+        )
+        with db_connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            claimed.update(tuple(row) for row in cursor.fetchall())
+    return claimed
+
+
+def release_notifications(todo_ids, kind, sent_on=None):
+    """Trả lại chỗ (xoá phiếu) cho các thông báo gửi lỗi để lần sau gửi lại."""
+    if not todo_ids:
+        return
+    SentNotification.objects.filter(
+        todo_id__in=todo_ids, kind=kind, sent_on=sent_on
+    ).delete()
+
+
+# ============== Nhắc trước hạn (NotificationSetting) ==============
+
+def claim_due_reminders(queryset, now, limit=REMINDER_BATCH_SIZE):
+    """
+    Lấy và giữ chỗ 1 lô cấu hình đến giờ nhắc, trong 1 transaction ngắn:
+    - SELECT ... FOR UPDATE SKIP LOCKED: các worker song song lấy các lô khác nhau
+    - INSERT SentNotification: chốt chặn cuối, mỗi cấu hình chỉ được gửi 1 lần
+    - đặt last_sent_at để các lần quét sau không lấy lại
+    Trả về (số dòng đã lấy, list cấu hình được phép gửi).
+    """
+    with transaction.atomic():
+        settings = list(
+            queryset.select_for_update(skip_locked=True, of=("self",))[:limit]
+        )
+        if not settings:
+            return 0, []
+        claimed = claim_notifications(
+            [(setting.todo_id, setting.id) for setting in settings],
+            SentNotification.KIND_REMINDER,
+        )
+        NotificationSetting.objects.filter(
+            id__in=[setting.id for setting in settings]
+        ).update(last_sent_at=now)
+    return len(settings), [
+        setting for setting in settings if (setting.todo_id, setting.id) in claimed
+    ]
+
+
+def release_reminders(setting_ids):
+    """Trả chỗ cho các nhắc gửi lỗi: lần chạy sau sẽ gửi lại."""
+    if not setting_ids:
+        return
+    with transaction.atomic():
+        SentNotification.objects.filter(
+            notification_setting_id__in=setting_ids,
+            kind=SentNotification.KIND_REMINDER,
+        ).delete()
+        NotificationSetting.objects.filter(id__in=setting_ids).update(last_sent_at=None)
+
+
+def send_reminders(queryset, now, on_error=None, batch_size=REMINDER_BATCH_SIZE):
+    """
+    Giữ chỗ theo lô rồi gửi qua 1 kết nối SMTP, đến khi queryset hết dòng.
+    An toàn khi nhiều process/thread chạy cùng lúc (mỗi nhắc gửi tối đa 1 lần).
+    on_error(setting, exc): callback khi 1 email gửi lỗi.
+    Trả về (số đã gửi, số lỗi).
+    """
+    sent_count = 0
+    failed_ids = []
+
+    connection = get_connection(fail_silently=False)
+    with connection:
+        while True:
+            locked, settings = claim_due_reminders(queryset, now, batch_size)
+            if not locked:
+                break
+            for setting in settings:
+                try:
+                    connection.send_messages([build_reminder_email(setting, connection)])
+                    sent_count += 1
+                except Exception as e:
+                    if on_error:
+                        on_error(setting, e)
+                    failed_ids.append(setting.id)
+
+    # Trả chỗ sau cùng để lần chạy này không lấy lại các nhắc vừa lỗi
+    release_reminders(failed_ids)
+    return sent_count, len(failed_ids)
+
+
+# ============== Nhắc hằng ngày (Todo.daily_reminder_time) ==============
+
+def daily_reminder_ranges(now, lookback_minutes):
+    """
+    Các khoảng (ngày, giờ bắt đầu, giờ kết thúc) theo giờ địa phương cần xét:
+    từ đầu phút (now - lookback) đến now. Khoảng qua nửa đêm được tách làm 2.
+    """
+    end = timezone.localtime(now)
+    start = (end - timedelta(minutes=lookback_minutes)).replace(second=0, microsecond=0)
+    if start.date() == end.date():
+        return [(end.date(), start.time(), end.time())]
+    return [
+        (start.date(), start.time(), time.max),
+        (end.date(), time.min, end.time()),
+    ]
+
+
+def due_daily_todos(sent_on, start, end):
+    """
+    Todo chưa xong có giờ nhắc trong [start, end] và chưa được nhắc ngày sent_on.
+    1 truy vấn khoảng trên index (daily_reminder_time, completed), sắp theo owner.
+    """
+    already_sent = SentNotification.objects.filter(
+        todo=OuterRef("pk"),
+        kind=SentNotification.KIND_DAILY,
+        sent_on=sent_on,
+    )
+    return (
+        Todo.objects.filter(
+            daily_reminder_time__gte=start,
+            daily_reminder_time__lte=end,
+            completed=False,
+        )
+        .exclude(owner__email="")
+        .exclude(owner__email__isnull=True)
+        .filter(~Exists(already_sent))
+        .order_by("owner_id", "daily_reminder_time", "id")
+        .values(
+            "id",
+            "title",
+            "priority",
+            "due_at",
+            "daily_reminder_time",
+            "owner_id",
+            "owner__username",
+            "owner__email",
+        )
+    )
+
+
+def build_daily_digest(todos, connection=None):
+    """1 email tổng hợp các việc cần nhắc hôm nay của 1 user."""
+    first = todos[0]
+    subject = f"Nhắc việc hằng ngày: {len(todos)} công việc"
+    lines = [
+        f"Chào {first['owner__username'] or first['owner__email']},",
+        "",
+        "Các công việc bạn đã đặt nhắc hằng ngày:",
+    ]
+    for todo in todos:
+        line = f"- {todo['daily_reminder_time'].strftime('%H:%M')} {todo['title']} ({todo['priority']})"
+        if todo["due_at"]:
+            local_due = timezone.localtime(todo["due_at"])
+            line += f", đến hạn {local_due.strftime('%d/%m/%Y %H:%M')}"
+        lines.append(line)
+    lines.append("")
+    lines.append("Đây là email tự động từ hệ thống quản lý công việc.")
+
+    return EmailMessage(
+        subject,
+        "\n".join(lines),
+        None,
+        [first["owner__email"]],
+        connection=connection,
+    )
+
+
+def _send_daily_batch(rows, sent_on, connection, on_error):
+    """Giữ chỗ cả lô, gửi digest theo user, trả chỗ cho các user gửi lỗi."""
+    claimed = {
+        todo_id
+        for todo_id, _ in claim_notifications(
+            [(row["id"], None) for row in rows], SentNotification.KIND_DAILY, sent_on
+        )
+    }
+    sent = failed = 0
+    released = []
+    rows = [row for row in rows if row["id"] in claimed]
+    for owner_id, group in groupby(rows, key=lambda row: row["owner_id"]):
+        todos = list(group)
+        try:
+            connection.send_messages([build_daily_digest(todos, connection)])
+            sent += 1
+        except Exception as e:
+            if on_error:
+                on_error(owner_id, e)
+            released += [todo["id"] for todo in todos]
+            failed += 1
+    release_notifications(released, SentNotification.KIND_DAILY, sent_on)
+    return sent, failed
+
+
+def send_daily_reminders(now=None, lookback_minutes=5, on_error=None):
+    """
+    Gửi digest nhắc hằng ngày cho các todo có giờ nhắc trong khoảng
+    [now - lookback, now]. Chạy lại (hoặc chạy chồng) không gửi trùng nhờ
+    SentNotification(kind=daily, sent_on). Trả về (số email đã gửi, số lỗi).
+    """
+    now = now or timezone.now()
+    sent = failed = 0
+
+    connection = get_connection(fail_silently=False)
+    with connection:
+        for sent_on, start, end in daily_reminder_ranges(now, lookback_minutes):
+            batch = []
+            for row in due_daily_todos(sent_on, start, end).iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+                # Không cắt giữa các todo của cùng 1 user để mỗi user chỉ nhận 1 email
+                if len(batch) >= DAILY_BATCH_SIZE and row["owner_id"] != batch[-1]["owner_id"]:
+                    s, f = _send_daily_batch(batch, sent_on, connection, on_error)
+                    sent, failed = sent + s, failed + f
+                    batch = []
+                batch.append(row)
+            if batch:
+                s, f = _send_daily_batch(batch, sent_on, connection, on_error)
+                sent, failed = sent + s, failed + f
+    return sent, failed
@@ -0,0 +1,128 @@
+# todo/services/stats.py
+"""
+Bộ đếm UserTodoStats được cập nhật theo delta mỗi khi ghi Todo.
+Delta là dict {tên field: +n/-n}, ví dụ {"total": 1, "high_total": 1}.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from ..models import Todo, UserTodoStats
+
+# Priority -> tiền tố field trong UserTodoStats
+PRIORITY_PREFIX = {
+    "Low": "low",
+    "Medium": "medium",
+    "High": "high",
+    "Urgent": "urgent",
+}
+
+STATS_FIELDS = ["total", "completed"] + [
+    f"{prefix}_{kind}"
+    for prefix in PRIORITY_PREFIX.values()
+    for kind in ("total", "completed")
+]
+
+
+def todo_stats_delta(priority, completed, sign=1):
+    """Delta của một Todo (sign=1 khi thêm, -1 khi xoá)."""
+    delta = Counter({"total": sign})
+    if completed:
+        delta["completed"] += sign
+    prefix = PRIORITY_PREFIX.get(priority)
+    if prefix:
+        delta[f"{prefix}_total"] += sign
+        if completed:
+            delta[f"{prefix}_completed"] += sign
+    return delta
+
+
+def todo_change_delta(old_priority, old_completed, new_priority, new_completed):
+    """Delta khi một Todo đổi priority/completed."""
+    delta = todo_stats_delta(new_priority, new_completed)
+    delta.subtract(todo_stats_delta(old_priority, old_completed))
+    return delta
+
+
+def apply_stats_delta(user_id, delta):
+    """
+    Cộng delta vào UserTodoStats bằng 1 câu UPDATE với F().
+    Nếu user chưa có dòng thống kê thì tính lại toàn bộ từ bảng Todo.
+    """
+    changes = {field: F(field) + value for field, value in delta.items() if value}
+    if not changes:
+        return
+    updated = UserTodoStats.objects.filter(user_id=user_id).update(
+        updated_at=timezone.now(),
+        **changes,
+    )
+    if not updated:
+        rebuild_user_stats(user_id)
+
+
+def _stats_aggregates():
+    # Alias có tiền tố "n_" để không trùng tên field (completed) khi filter
+    aggregates = {
+        "n_total": Count("id"),
+        "n_completed": Count("id", filter=Q(completed=True)),
+    }
+    for priority, prefix in PRIORITY_PREFIX.items():
+        aggregates[f"n_{prefix}_total"] = Count("id", filter=Q(priority=priority))
+        aggregates[f"n_{prefix}_completed"] = Count(
+            "id", filter=Q(priority=priority, completed=True)
+        )
+    return aggregates
+
+
+def _strip_alias(row):
+    return {field: row[f"n_{field}"] for field in STATS_FIELDS}
+
+
+def compute_user_stats(user_id):
+    """Đếm lại từ bảng Todo (1 query)."""
+    return _strip_alias(
+        Todo.objects.filter(owner_id=user_id).aggregate(**_stats_aggregates())
+    )
+
+
+def compute_all_stats():
+    """Đếm lại cho mọi user có Todo, 1 query gom nhóm theo owner."""
+    rows = (
+        Todo.objects.order_by()
+        .values("owner_id")
+        .annotate(**_stats_aggregates())
+    )
+    return {row["owner_id"]: _strip_alias(row) for row in rows}
+
+
+def rebuild_user_stats(user_id):
+    """
+    Đếm lại và ghi đè dòng thống kê của user.
+    Khoá dòng thống kê TRƯỚC khi đếm: transaction đang sửa Todo sẽ chờ khoá
+    rồi mới cộng delta F() vào giá trị mới, nên không có delta nào bị ghi đè.
+    """
+    with transaction.atomic():
+        stats = UserTodoStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None:
+            try:
+                with transaction.atomic():
+                    return UserTodoStats.objects.create(
+                        user_id=user_id, **compute_user_stats(user_id)
+                    )
+            except IntegrityError:
+                # Request khác vừa tạo dòng thống kê cùng lúc
+                stats = UserTodoStats.objects.select_for_update().get(user_id=user_id)
+        for field, value in compute_user_stats(user_id).items():
+            setattr(stats, field, value)
+        stats.save(update_fields=STATS_FIELDS + ["updated_at"])
+    return stats
+
+
+def get_user_stats(user_id):
+    """Đọc dòng thống kê theo khoá chính; tạo mới nếu chưa có."""
+    stats = UserTodoStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats = rebuild_user_stats(user_id)
+    return stats
@@ -0,0 +1,203 @@
+# todo/services/sync.py
+"""
+Delta sync cho GET /api/todos/changes/: client giữ 1 token (opaque) và
+chỉ nhận các todo tạo/sửa hoặc bị xoá (DeletedTodo) kể từ token đó, phân trang
+theo (change_seq, id).
+
+change_seq do trigger trong DB gán (migration 0017) và chỉ được đọc dưới mốc
+commit (commit_low_water): transaction commit muộn (vd import CSV dài) không thể
+chen vào sau vị trí client đã đọc.
+
+Tombstone cũ hơn TODO_SYNC_TOMBSTONE_DAYS bị dọn (prune_deletions); token chưa
+đọc tới mốc đã dọn nhận SyncTokenExpired -> client đồng bộ lại từ đầu.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Exists, Max, OuterRef, Q, Subquery, Value, When
+
+from ..models import DeletedTodo, DeletedTodoPrune, TaskShare, Todo
+
+CHANGES_PAGE_SIZE = 200
+CHANGES_MAX_PAGE_SIZE = 1000
+TOMBSTONE_DAYS = getattr(settings, "TODO_SYNC_TOMBSTONE_DAYS", 30)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class SyncTokenExpired(InvalidSyncToken):
+    """Token cũ hơn mốc dọn tombstone (hoặc định dạng cũ): phải đồng bộ lại từ đầu."""
+    pass
+
+
+def commit_low_water():
+    """
+    Mốc commit: mọi dòng có change_seq nhỏ hơn mốc này đã commit (hoặc rollback),
+    sau này không còn dòng nào mang change_seq nhỏ hơn xuất hiện thêm.
+    - PostgreSQL: change_seq là txid của transaction ghi, mốc là xmin của
+      snapshot (txid nhỏ nhất còn đang chạy).
+    - SQLite: chỉ 1 transaction ghi tại 1 thời điểm, mốc là bộ đếm đã commit + 1.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        else:
+            cursor.execute("SELECT value + 1 FROM todo_change_counter")
+        return cursor.fetchone()[0]
+
+
+def visible_todos(user):
+    """
+    Todo user thấy được: của mình + được share và đã chấp nhận, trong 1 query
+    (EXISTS nên không nhân bản dòng), kèm annotate permission = owner | edit | view.
+    """
+    shares = TaskShare.objects.filter(task=OuterRef("pk"), shared_to=user, accepted=True)
+    return Todo.objects.filter(Q(owner=user) | Exists(shares)).annotate(
+        permission=Case(
+            When(owner=user, then=Value("owner")),
+            default=Subquery(shares.values("permission")[:1]),
+            output_field=CharField(),
+        )
+    )
+
+
+def todo_audience(todos):
+    """
+    Danh sách (todo_id, owner_id) -> tập (todo_id, user_id) của mọi user
+    đang thấy các todo đó: owner + người nhận share đã chấp nhận (1 query).
+    """
+    todos = list(todos)
+    audience = set(todos)
+    if todos:
+        audience.update(
+            TaskShare.objects.filter(
+                task_id__in=[todo_id for todo_id, _ in todos],
+                accepted=True,
+                shared_to__isnull=False,
+            ).values_list("task_id", "shared_to_id")
+        )
+    return audience
+
+
+def record_deletions(audience):
+    """
+    Ghi tombstone cho tập (todo_id, user_id) từ todo_audience(), gọi trong
+    cùng transaction xoá; audience phải lấy trước khi xoá (TaskShare bị xoá
+    theo CASCADE).
+    """
+    if not audience:
+        return
+    DeletedTodo.objects.bulk_create(
+        [DeletedTodo(todo_id=todo_id, user_id=user_id) for todo_id, user_id in audience]
+    )
+
+
+def pruned_seq():
+    mark = DeletedTodoPrune.objects.filter(pk=1).values_list("pruned_seq", flat=True).first()
+    return mark or 0
+
+
+def prune_deletions(older_than):
+    """
+    Xoá tombstone có deleted_at < older_than và ghi lại mốc change_seq lớn nhất
+    đã xoá. Trả về số dòng đã xoá.
+    """
+    with transaction.atomic():
+        mark, _ = DeletedTodoPrune.objects.select_for_update().get_or_create(pk=1)
+        # Chỉ dọn dòng dưới mốc commit: tập này không còn thay đổi
+        old = DeletedTodo.objects.filter(
+            deleted_at__lt=older_than, change_seq__lt=commit_low_water()
+        )
+        max_seq = old.aggregate(max_seq=Max("change_seq"))["max_seq"]
+        if max_seq is None:
+            return 0
+        deleted, _ = old.filter(change_seq__lte=max_seq).delete()
+        if max_seq > mark.pruned_seq:
+            mark.pruned_seq = max_seq
+        mark.save()
+    return deleted
+
+
+def encode_token(position):
+    payload = json.dumps(
+        {"s": position["s"], "id": position["id"], "ds": position["ds"], "did": position["did"]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_token(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except (TypeError, ValueError, AttributeError, UnicodeDecodeError, binascii.Error):
+        raise InvalidSyncToken("Token không hợp lệ")
+    if isinstance(payload, dict) and "dt" in payload:
+        # Token cũ theo updated_at
+        raise SyncTokenExpired("Token đã hết hạn, cần đồng bộ lại từ đầu")
+    try:
+        return {
+            "s": int(payload["s"]),
+            "id": int(payload["id"]),
+            "ds": int(payload["ds"]),
+            "did": int(payload["did"]),
+        }
+    except (TypeError, ValueError, KeyError):
+        raise InvalidSyncToken("Token không hợp lệ")
+
+
+def _after(value, pk):
+    if value is None:
+        return Q()
+    return Q(change_seq__gt=value) | Q(change_seq=value, id__gt=pk)
+
+
+def changes_since(user, token=None, page_size=CHANGES_PAGE_SIZE):
+    """
+    Trả về (todos, deleted_ids, next_token, has_more).
+    Không có token: đồng bộ lần đầu, trả toàn bộ todo (theo trang) và bỏ qua
+    các dấu xoá cũ. Client gọi tiếp với next_token đến khi has_more = False,
+    lần poll sau lại dùng next_token cuối cùng.
+    Token chưa đọc tới mốc tombstone đã dọn: SyncTokenExpired.
+    """
+    low_water = commit_low_water()
+    if token:
+        position = decode_token(token)
+        if position["ds"] <= pruned_seq():
+            raise SyncTokenExpired("Token đã hết hạn, cần đồng bộ lại từ đầu")
+    else:
+        position = {"s": None, "id": 0, "ds": low_water, "did": 0}
+
+    todos = list(
+        visible_todos(user)
+        .filter(_after(position["s"], position["id"]), change_seq__lt=low_water)
+        .select_related("category", "owner")
+        .order_by("change_seq", "id")[: page_size + 1]
+    )
+    deleted = list(
+        DeletedTodo.objects.filter(
+            _after(position["ds"], position["did"]), user=user, change_seq__lt=low_water
+        )
+        .order_by("change_seq", "id")
+        .values_list("id", "todo_id", "change_seq")[: page_size + 1]
+    )
+
+    has_more = len(todos) > page_size or len(deleted) > page_size
+    # Đã đọc hết phần dưới mốc commit: token nhảy tới mốc, kể cả khi không có
+    # thay đổi (token của user ít thay đổi không bị tụt sau mốc dọn tombstone)
+    if len(todos) > page_size:
+        todos = todos[:page_size]
+        position["s"], position["id"] = todos[-1].change_seq, todos[-1].pk
+    else:
+        position["s"], position["id"] = low_water, 0
+    if len(deleted) > page_size:
+        deleted = deleted[:page_size]
+        position["did"], _, position["ds"] = deleted[-1]
+    else:
+        position["ds"], position["did"] = low_water, 0
+
+    return todos, [todo_id for _, todo_id, _ in deleted], encode_token(position), has_more
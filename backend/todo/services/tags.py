@@ -0,0 +1,79 @@
+# todo/services/tags.py
+"""
+Đồng bộ chuỗi Todo.tags ("a, b") sang bảng Tag/TodoTag có index.
+Mọi hàm đều xử lý theo lô: số query không phụ thuộc số todo.
+"""
+from ..models import Tag, TodoTag
+
+TAG_MAX_LENGTH = Tag._meta.get_field("name").max_length
+
+
+def split_tags(value):
+    """'a, b, a' -> ['a', 'b'] (bỏ trùng, giữ thứ tự)."""
+    if not value:
+        return []
+    names = []
+    for name in value.split(","):
+        name = name.strip()[:TAG_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def ensure_tags(owner_id, names):
+    """Trả về {tên: tag_id}, tạo các thẻ chưa có (tối đa 3 query)."""
+    names = set(names)
+    if not names:
+        return {}
+    tag_ids = dict(
+        Tag.objects.filter(owner_id=owner_id, name__in=names).values_list("name", "id")
+    )
+    missing = names - tag_ids.keys()
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(owner_id=owner_id, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        tag_ids.update(
+            Tag.objects.filter(owner_id=owner_id, name__in=missing).values_list("name", "id")
+        )
+    return tag_ids
+
+
+def sync_todo_tags(todos):
+    """
+    Cập nhật TodoTag cho danh sách todo (cùng owner) theo chuỗi tags hiện tại:
+    thêm liên kết còn thiếu, xoá liên kết không còn trong chuỗi.
+    """
+    todos = [todo for todo in todos if todo.pk]
+    if not todos:
+        return
+
+    wanted = {todo.pk: split_tags(todo.tags) for todo in todos}
+    tag_ids = ensure_tags(
+        todos[0].owner_id,
+        {name for names in wanted.values() for name in names},
+    )
+    wanted_pairs = {
+        (todo_id, tag_ids[name])
+        for todo_id, names in wanted.items()
+        for name in names
+    }
+
+    existing = {
+        (todo_id, tag_id): pk
+        for pk, todo_id, tag_id in TodoTag.objects.filter(todo_id__in=wanted).values_list(
+            "id", "todo_id", "tag_id"
+        )
+    }
+
+    stale = [pk for pair, pk in existing.items() if pair not in wanted_pairs]
+    if stale:
+        TodoTag.objects.filter(pk__in=stale).delete()
+
+    new_pairs = wanted_pairs - existing.keys()
+    if new_pairs:
+        TodoTag.objects.bulk_create(
+            [TodoTag(todo_id=todo_id, tag_id=tag_id) for todo_id, tag_id in new_pairs],
+            ignore_conflicts=True,
+        )
@@ -0,0 +1,198 @@
+# todo/services/user_cache.py
+"""
+Cache theo user có đánh phiên bản (generation).
+
+Mỗi user có một bộ đếm version lưu trong cache dùng chung (file/Redis).
+Mọi key report đều chứa version hiện tại, nên khi dữ liệu thay đổi chỉ cần
+tăng version là toàn bộ key cũ của user đó hết hiệu lực trên mọi worker,
+không phải xoá/scan từng key (key cũ tự hết hạn theo TTL).
+
+Version chỉ đúng khi add()/incr() nguyên tử giữa mọi worker (Redis, memcached).
+FileBasedCache làm get + set riêng rẽ nên có thể mất 1 lần bump và trả dữ liệu cũ:
+khi đó layer này tắt hẳn (report tính trực tiếp, không có ETag).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Alias trong settings.CACHES dùng cho layer này
+CACHE_ALIAS = getattr(settings, "TODO_CACHE_ALIAS", "default")
+
+# TTL mặc định cho report (giây); version đảm bảo không đọc dữ liệu cũ
+REPORT_CACHE_TIMEOUT = getattr(settings, "REPORT_CACHE_TIMEOUT", 300)
+
+# Backend có add()/incr() nguyên tử giữa các process
+ATOMIC_CACHE_BACKENDS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django_redis.cache.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+)
+LOCMEM_CACHE_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+logger = logging.getLogger(__name__)
+_warned_disabled = False
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def has_atomic_cache():
+    """
+    True nếu add()/incr() của backend nguyên tử với mọi worker: Redis/memcached,
+    hoặc locmem khi chỉ chạy 1 process (settings.TODO_CACHE_SINGLE_PROCESS).
+    Cần cho cả version theo user lẫn lock single-flight của cached_report.
+    """
+    global _warned_disabled
+    backend = settings.CACHES[CACHE_ALIAS]["BACKEND"]
+    if backend in ATOMIC_CACHE_BACKENDS:
+        return True
+    if backend == LOCMEM_CACHE_BACKEND and getattr(settings, "TODO_CACHE_SINGLE_PROCESS", False):
+        return True
+    if not _warned_disabled:
+        _warned_disabled = True
+        logger.warning(
+            "Cache %s không có add/incr nguyên tử: tắt cache report và ETag theo user",
+            backend,
+        )
+    return False
+
+
+def _version_key(user_id):
+    return f"user_{user_id}_version"
+
+
+def _initial_version():
+    # Dùng timestamp (ms) làm version khởi tạo để nếu key version bị evict
+    # thì version mới không trùng với version cũ còn nằm trong cache
+    return int(time.time() * 1000)
+
+
+def get_user_version(user_id):
+    """Version hiện tại của user, None nếu backend không hỗ trợ (xem has_atomic_cache)."""
+    if not has_atomic_cache():
+        return None
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(key, version, timeout=None):
+            # Worker khác vừa khởi tạo trước
+            version = cache.get(key, version)
+    return version
+
+
+def bump_user_version(user_id):
+    """Tăng version của user -> mọi key report cũ của user hết hiệu lực."""
+    if not has_atomic_cache():
+        return None
+    cache = get_cache()
+    key = _version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key chưa có (hoặc đã bị evict)
+        version = _initial_version()
+        if cache.add(key, version, timeout=None):
+            return version
+        return cache.incr(key)
+
+
+def user_cache_key(user_id, name):
+    """
+    Key cache gắn với version hiện tại của user, vd report_5_v1733300000000_progress.
+    None khi không đánh version được: cached_report() sẽ tính trực tiếp.
+    """
+    version = get_user_version(user_id)
+    if version is None:
+        return None
+    return f"report_{user_id}_v{version}_{name}"
+
+
+# ================== CACHED REPORT (single-flight) ==================
+
+# Sentinel phân biệt "không có trong cache" với giá trị rỗng ([], 0, {})
+_MISSING = object()
+
+# Thời gian giữ lock tính toán (giây) – phòng khi process tính bị chết giữa chừng
+COMPUTE_LOCK_TIMEOUT = 10
+# Request không giữ lock sẽ chờ kết quả tối đa chừng này trước khi tự tính
+COMPUTE_WAIT_TIMEOUT = 2.0
+COMPUTE_WAIT_INTERVAL = 0.05
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "waited": 0, "computed": 0}
+
+
+def _incr_stat(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """Bộ đếm hit/miss của process hiện tại (hits, misses, waited, computed)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def cached_report(key, compute, timeout=None):
+    """
+    Lấy giá trị từ cache, nếu miss thì gọi compute() và lưu lại.
+    - Miss được xác định bằng sentinel nên kết quả rỗng vẫn được cache.
+    - Chỉ một request (trên mọi worker) được tính lại cho mỗi key nhờ lock
+      cache.add(); các request khác chờ kết quả thay vì cùng chạy query.
+      Lock chỉ dùng khi add() nguyên tử (has_atomic_cache), nếu không thì tính luôn.
+    """
+    if key is None:
+        return compute()
+    cache = get_cache()
+    if timeout is None:
+        timeout = REPORT_CACHE_TIMEOUT
+
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _incr_stat("hits")
+        return value
+    _incr_stat("misses")
+
+    if not has_atomic_cache():
+        # add() không độc quyền giữa các worker: lock không có tác dụng
+        value = compute()
+        cache.set(key, value, timeout)
+        _incr_stat("computed")
+        return value
+
+    lock_key = f"{key}_lock"
+    if cache.add(lock_key, 1, COMPUTE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+            _incr_stat("computed")
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    # Request khác đang tính key này: chờ kết quả một chút
+    deadline = time.monotonic() + COMPUTE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(COMPUTE_WAIT_INTERVAL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            _incr_stat("waited")
+            return value
+
+    # Quá thời gian chờ: tự tính (không ghi đè lock của request kia)
+    value = compute()
+    _incr_stat("computed")
+    return value
@@ -1,3 +1,786 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .models import (
+    Category,
+    DeletedTodo,
+    ExportLog,
+    NotificationSetting,
+    OutboundEmail,
+    SentNotification,
+    TaskShare,
+    Todo,
+    UserTodoStats,
+)
+from .services import ai, outbox, reminders
+from .services.chatbot import TaskChatbot
+from .services.csv_io import import_todos_csv
+from .services.stats import compute_user_stats
+from .services.sync import prune_deletions
+from .services.tags import sync_todo_tags
+from .views import TodoViewSet
+
+
+class StatsAssertionsMixin:
+    def assertStatsConsistent(self, user):
+        # Bộ đếm UserTodoStats phải khớp với đếm lại từ bảng Todo
+        expected = compute_user_stats(user.id)
+        stats = UserTodoStats.objects.get(user=user)
+        self.assertEqual({field: getattr(stats, field) for field in expected}, expected)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    TODO_CACHE_SINGLE_PROCESS=True,
+)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", "alice@example.com", "pw")
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        Todo.objects.create(owner=self.user, title="Viết báo cáo")
+
+    def test_not_modified_costs_one_query(self):
+        for url in ("/api/todos/", "/api/categories/", "/api/reports/progress/"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+
+            # Chỉ còn query xác thực token, không chạy query danh sách/report
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(response["ETag"], etag)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get("/api/todos/")["ETag"]
+
+        response = self.client.post("/api/todos/", {"title": "Task mới"}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get("/api/todos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_category_change_changes_etag(self):
+        etag = self.client.get("/api/categories/")["ETag"]
+
+        self.client.post("/api/categories/", {"name": "Công việc"}, format="json")
+
+        response = self.client.get("/api/categories/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_etag_depends_on_query(self):
+        first = self.client.get("/api/todos/", {"completed": "true"})
+        second = self.client.get("/api/todos/", {"completed": "false"})
+        self.assertNotEqual(first["ETag"], second["ETag"])
+
+    def test_etag_depends_on_user(self):
+        other = User.objects.create_user("zoe", "zoe@example.com", "pw")
+        client = APIClient()
+        client.force_authenticate(other)
+        # Cùng URL, cùng version nhưng khác user -> khác ETag, không trả 304
+        with mock.patch("todo.views.get_user_version", return_value=1):
+            etag = self.client.get("/api/todos/")["ETag"]
+            response = client.get("/api/todos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": "/tmp/todo-test-cache",
+        }
+    }
+)
+class NonAtomicCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob", "bob@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_no_etag_and_fresh_reports(self):
+        # FileBasedCache không có add/incr nguyên tử: không ETag, report luôn tính lại
+        response = self.client.get("/api/reports/progress/")
+        self.assertNotIn("ETag", response)
+        self.assertEqual(response.data["total_tasks"], 0)
+
+        self.client.post("/api/todos/", {"title": "Task mới"}, format="json")
+        response = self.client.get("/api/reports/progress/")
+        self.assertEqual(response.data["total_tasks"], 1)
+
+
+class ExportCsvTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("hana", "hana@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(owner=self.user, name="Học")
+        for i in range(4):
+            Todo.objects.create(
+                owner=self.user,
+                title=f"Task {i}",
+                priority="High" if i % 2 else "Low",
+                category=category,
+            )
+        Todo.objects.create(owner=User.objects.create_user("ivan"), title="Của Ivan", priority="High")
+
+    def test_export_streams_filtered_rows(self):
+        response = self.client.get("/api/todos/export-csv/", {"priority": "High"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+
+        lines = iter(response.streaming_content)
+        header = next(lines).decode()
+        self.assertTrue(header.startswith("\ufeffid,title,"))
+        # Dòng đầu đã gửi đi khi chưa đọc hết queryset: ExportLog chưa có số dòng
+        self.assertEqual(ExportLog.objects.get(user=self.user).exported_count, 0)
+
+        rows = [line.decode() for line in lines]
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(",High," in row and ",Học," in row for row in rows))
+        self.assertEqual(ExportLog.objects.get(user=self.user).exported_count, 2)
+
+
+class ExportCsvAsgiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("carol", "carol@example.com", "pw")
+        self.token = Token.objects.create(user=self.user).key
+        Todo.objects.bulk_create(
+            [Todo(owner=self.user, title=f"Task {i}") for i in range(25)]
+        )
+
+    async def test_export_streams_in_chunks(self):
+        # Dưới ASGI, iterator sync bị gom cả file: export phải trả iterator async
+        with mock.patch("todo.views.EXPORT_ASGI_LINES", 10):
+            response = await self.async_client.get(
+                "/api/todos/export-csv/", headers={"authorization": f"Token {self.token}"}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+
+            chunks = [chunk async for chunk in response.streaming_content]
+
+        # Header + 25 dòng, đọc 10 dòng mỗi lần -> 3 khối, không phải 1 khối cả file
+        self.assertEqual([chunk.decode().count("\n") for chunk in chunks], [10, 10, 6])
+        log = await ExportLog.objects.aget(user=self.user)
+        self.assertEqual(log.exported_count, 25)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("minh", "minh@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        # Task 0 và 4 không có hạn, một số task trùng hạn (thứ tự dựa vào id)
+        Todo.objects.bulk_create(
+            [
+                Todo(
+                    owner=self.user,
+                    title=f"Task {i}",
+                    due_at=now + timedelta(days=i % 3) if i % 4 else None,
+                )
+                for i in range(7)
+            ]
+        )
+        # Cùng created_at: thứ tự giữa các trang dựa vào id
+        Todo.objects.update(created_at=now)
+
+    def collect(self, params, insert_after_first_page=False):
+        ids = []
+        response = self.client.get("/api/todos/", {"cursor": "", "page_size": 3, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids += [todo["id"] for todo in response.data["results"]]
+            if insert_after_first_page:
+                insert_after_first_page = False
+                Todo.objects.create(owner=self.user, title="Task mới chen vào")
+            if not response.data["next"]:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def test_pages_are_stable_under_inserts(self):
+        expected = list(Todo.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        # Task tạo giữa chừng nằm trước trang đầu nên không làm lệch/lặp trang sau
+        self.assertEqual(self.collect({}, insert_after_first_page=True), expected)
+
+    def test_nullable_ordering_puts_nulls_last(self):
+        expected = list(
+            Todo.objects.order_by(F("due_at").asc(nulls_last=True), "id").values_list("id", flat=True)
+        )
+        self.assertEqual(self.collect({"ordering": "due_at"}), expected)
+        self.assertIsNone(Todo.objects.get(id=expected[-1]).due_at)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/todos/", {"cursor": "không-hợp-lệ"})
+        self.assertEqual(response.status_code, 404)
+
+
+class TagFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("nga", "nga@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title, tags):
+        return self.client.post("/api/todos/", {"title": title, "tags": tags}, format="json").data["id"]
+
+    def filter_ids(self, tags, **params):
+        response = self.client.get("/api/todos/", {"tags": tags, **params})
+        self.assertEqual(response.status_code, 200)
+        return {todo["id"] for todo in response.data["results"]}
+
+    def test_filter_requires_every_tag(self):
+        both = self.create("Cả hai", ["học", "python"])
+        only_python = self.create("Một thẻ", ["python"])
+        self.create("Không thẻ", [])
+
+        self.assertEqual(self.filter_ids("python"), {both, only_python})
+        self.assertEqual(self.filter_ids("python, học"), {both})
+        # Khớp nguyên tên thẻ, không khớp chuỗi con như icontains
+        self.assertEqual(self.filter_ids("py"), set())
+
+    def test_tag_changes_resync_index(self):
+        todo_id = self.create("Task", ["cũ"])
+        self.client.patch(f"/api/todos/{todo_id}/", {"tags": ["mới"]}, format="json")
+        self.assertEqual(self.filter_ids("cũ"), set())
+        self.assertEqual(self.filter_ids("mới"), {todo_id})
+
+        self.client.post(
+            "/api/todos/bulk/", {"ids": [todo_id], "operation": "add_tags", "value": ["thêm"]}, format="json"
+        )
+        self.assertEqual(self.filter_ids("mới,thêm"), {todo_id})
+
+        response = self.client.get("/api/todos/tags/")
+        self.assertEqual([tag["name"] for tag in response.data], ["mới", "thêm"])
+
+    def test_filter_keeps_shared_todos(self):
+        owner = User.objects.create_user("oanh", "oanh@example.com", "pw")
+        shared = Todo.objects.create(owner=owner, title="Được share", tags="nhóm")
+        sync_todo_tags([shared])
+        TaskShare.objects.create(
+            task=shared,
+            shared_by=owner,
+            shared_to=self.user,
+            permission="view",
+            share_link="share-tags",
+            accepted=True,
+        )
+        mine = self.create("Của mình", ["nhóm"])
+
+        self.assertEqual(self.filter_ids("nhóm"), {mine})
+        self.assertEqual(self.filter_ids("nhóm", include_shared=1), {mine, shared.id})
+
+
+class PredictBatchTests(TestCase):
+    ITEMS = [
+        {"priority": "Urgent", "estimated_duration_min": 480, "start_hour": 22, "day_of_week": 6},
+        {"priority": "Low", "estimated_duration_min": 15, "start_hour": 9, "day_of_week": 1},
+        {"priority": "High", "estimated_duration_min": 120, "start_hour": 14, "day_of_week": 3},
+        {"priority": "Low", "estimated_duration_min": 14, "start_hour": 9, "day_of_week": 1},
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user("phuong", "phuong@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        ai.clear_prediction_cache()
+        self.addCleanup(ai.clear_prediction_cache)
+
+    def test_batch_matches_single_predictions(self):
+        expected = []
+        for item in self.ITEMS:
+            ai.clear_prediction_cache()
+            expected.append(self.client.post("/api/predict/", item, format="json").data)
+        ai.clear_prediction_cache()
+
+        with mock.patch("todo.services.ai._run_model", wraps=ai._run_model) as run_model:
+            response = self.client.post("/api/predict/batch/", {"tasks": self.ITEMS}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["results"],
+            [{"index": index, **result} for index, result in enumerate(expected)],
+        )
+        # 1 lần gọi model; 15 và 14 phút cùng bước lượng tử nên chỉ dự đoán 1 lần
+        run_model.assert_called_once()
+        self.assertEqual(len(run_model.call_args.args[1]), 3)
+
+    def test_task_ids_keep_request_order(self):
+        todos = [Todo.objects.create(owner=self.user, title=f"Task {i}") for i in range(3)]
+        other = Todo.objects.create(owner=User.objects.create_user("quan"), title="Của Quân")
+        task_ids = [todos[2].id, other.id, todos[0].id, todos[2].id]
+
+        response = self.client.post("/api/predict/batch/", {"task_ids": task_ids}, format="json")
+
+        self.assertEqual(
+            [result["task_id"] for result in response.data["results"]],
+            [todos[2].id, todos[0].id],
+        )
+        self.assertEqual(response.data["missing"], [other.id])
+
+    def test_invalid_item_is_rejected(self):
+        items = [self.ITEMS[0], {"estimated_duration_min": "abc"}]
+        response = self.client.post("/api/predict/batch/", {"tasks": items}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data["error"].startswith("tasks[1]"))
+
+
+class ImportCsvTests(StatsAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("kim", "kim@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(owner=self.user, name="Học")
+
+    def test_import_reports_row_errors(self):
+        content = (
+            "\ufeffTitle,category,priority,due_at,completed,tags\n"
+            "Ôn thi,học,high,2030-12-31,true,a;b\n"
+            ",học,low,,,\n"
+            "Đi chợ,Nhà,urgent,,0,\n"
+            "Sai ngày,,medium,31/12,maybe,\n"
+        )
+        upload = SimpleUploadedFile("todos.csv", content.encode("utf-8"), content_type="text/csv")
+        response = self.client.post("/api/todos/import-csv/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3, 5])
+        self.assertEqual(set(response.data["errors"][1]["errors"]), {"due_at", "completed"})
+
+        first = Todo.objects.get(title="Ôn thi")
+        # Tên danh mục không phân biệt hoa thường, tên mới được tạo
+        self.assertEqual(first.category, self.category)
+        self.assertEqual(first.tags, "a, b")
+        self.assertTrue(Category.objects.filter(owner=self.user, name="Nhà").exists())
+        self.assertStatsConsistent(self.user)
+
+    def test_import_inserts_in_batches(self):
+        content = "title,priority\n" + "".join(f"Task {i},high\n" for i in range(5))
+        with mock.patch.object(Todo.objects, "bulk_create", wraps=Todo.objects.bulk_create) as bulk_create:
+            result = import_todos_csv(self.user, io.StringIO(content), batch_size=2)
+
+        self.assertEqual(result, {"created": 5, "failed": 0, "errors": []})
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [2, 2, 1])
+        self.assertEqual(UserTodoStats.objects.get(user=self.user).high_total, 5)
+
+    def test_missing_title_column(self):
+        upload = SimpleUploadedFile("todos.csv", b"foo,bar\n1,2\n")
+        response = self.client.post("/api/todos/import-csv/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+
+
+class StatsCounterTests(StatsAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lan", "lan@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title, priority):
+        response = self.client.post(
+            "/api/todos/", {"title": title, "priority": priority}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def test_counters_follow_every_write_path(self):
+        ids = [self.create(f"Task {i}", priority) for i, priority in enumerate(["Low", "High", "High"])]
+        self.assertStatsConsistent(self.user)
+
+        response = self.client.patch(f"/api/todos/{ids[0]}/", {"priority": "Urgent"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertStatsConsistent(self.user)
+
+        response = self.client.patch(f"/api/todos/{ids[1]}/toggle-status/")
+        self.assertTrue(response.data["completed"])
+        self.assertStatsConsistent(self.user)
+
+        response = self.client.put(
+            f"/api/todos/{ids[1]}/", {"title": "Task 1", "priority": "Low", "completed": False}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertStatsConsistent(self.user)
+
+        for operation, value in (
+            ("complete", None),
+            ("set_priority", "Medium"),
+            ("uncomplete", None),
+        ):
+            response = self.client.post(
+                "/api/todos/bulk/", {"ids": ids[1:], "operation": operation, "value": value}, format="json"
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertStatsConsistent(self.user)
+
+        self.assertEqual(self.client.delete(f"/api/todos/{ids[0]}/").status_code, 204)
+        self.assertStatsConsistent(self.user)
+
+        self.client.post("/api/todos/bulk/", {"ids": ids, "operation": "delete"}, format="json")
+        self.assertStatsConsistent(self.user)
+        self.assertEqual(UserTodoStats.objects.get(user=self.user).total, 0)
+
+    def test_report_reads_counters(self):
+        self.create("Task", "High")
+        done = self.create("Xong", "Low")
+        self.client.post("/api/todos/bulk/", {"ids": [done], "operation": "complete"}, format="json")
+
+        response = self.client.get("/api/reports/progress/")
+        self.assertEqual(response.data["total_tasks"], 2)
+        self.assertEqual(response.data["completed_tasks"], 1)
+
+
+class BulkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("vy", "vy@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.todo = Todo.objects.create(owner=self.user, title="Của Vy")
+        self.other = Todo.objects.create(owner=User.objects.create_user("xuan"), title="Của Xuân")
+
+    def bulk(self, operation, value=None, ids=None):
+        body = {"ids": ids or [self.todo.id], "operation": operation, "value": value}
+        return self.client.post("/api/todos/bulk/", body, format="json")
+
+    def test_invalid_values_are_rejected(self):
+        foreign_category = Category.objects.create(owner=self.other.owner, name="Của Xuân")
+        cases = [
+            ("set_priority", ["High"]),
+            ("set_priority", "Cao"),
+            ("set_category", True),
+            ("set_category", "1"),
+            ("set_category", foreign_category.id),
+            ("add_tags", "a,b"),
+            ("add_tags", [1]),
+            ("add_tags", [" ", ""]),
+            ("archive", None),
+        ]
+        for operation, value in cases:
+            with self.subTest(operation=operation, value=value):
+                self.assertEqual(self.bulk(operation, value).status_code, 400)
+
+        self.assertEqual(self.bulk("complete", ids=["x"]).status_code, 400)
+        self.assertEqual(self.bulk("complete", ids=list(range(1, 1002))).status_code, 400)
+        self.todo.refresh_from_db()
+        self.assertEqual(
+            (self.todo.priority, self.todo.category_id, self.todo.tags), ("Medium", None, "")
+        )
+
+    def test_only_own_todos_are_changed(self):
+        response = self.bulk("set_priority", "High", ids=[self.todo.id, self.other.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["ids"], [self.todo.id])
+        self.assertEqual(response.data["not_found"], [self.other.id])
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.priority, "Medium")
+
+        category = Category.objects.create(owner=self.user, name="Việc nhà")
+        self.assertEqual(self.bulk("set_category", category.id).status_code, 200)
+        self.assertEqual(Todo.objects.get(pk=self.todo.pk).category, category)
+
+
+# TransactionTestCase: mỗi request tự commit, mốc commit (xmin trên PostgreSQL)
+# mới vượt qua các thay đổi như khi chạy thật
+class ChangesSyncTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("yen", "yen@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title):
+        return self.client.post("/api/todos/", {"title": title}, format="json").data["id"]
+
+    def changes(self, since=None, **params):
+        if since:
+            params["since"] = since
+        response = self.client.get("/api/todos/changes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def sync(self, since=None, page_size=200):
+        # Đọc hết các trang, trả về (id đã đổi, id đã xoá, token cuối)
+        changed, deleted = [], []
+        while True:
+            data = self.changes(since, page_size=page_size)
+            changed += [todo["id"] for todo in data["changed"]]
+            deleted += data["deleted"]
+            since = data["next"]
+            if not data["has_more"]:
+                return changed, deleted, since
+
+    def test_round_trip(self):
+        first, second = self.create("Một"), self.create("Hai")
+        changed, deleted, token = self.sync()
+        self.assertEqual(changed, [first, second])
+        self.assertEqual(deleted, [])
+
+        # Không có gì mới: không trả lại dữ liệu cũ
+        self.assertEqual(self.sync(token)[:2], ([], []))
+
+        self.client.patch(f"/api/todos/{first}/", {"title": "Một (sửa)"}, format="json")
+        third = self.create("Ba")
+        self.client.delete(f"/api/todos/{second}/")
+
+        for page_size in (1, 200):
+            with self.subTest(page_size=page_size):
+                changed, deleted, _ = self.sync(token, page_size)
+                self.assertEqual(changed, [first, third])
+                self.assertEqual(deleted, [second])
+
+        data = self.changes(token)
+        self.assertEqual(data["changed"][0]["title"], "Một (sửa)")
+
+    def test_recipient_receives_shared_deletion(self):
+        recipient = User.objects.create_user("yul", "yul@example.com", "pw")
+        todo_id = self.create("Việc chung")
+        TaskShare.objects.create(
+            task_id=todo_id,
+            shared_by=self.user,
+            shared_to=recipient,
+            permission="view",
+            share_link="share-sync",
+            accepted=True,
+        )
+        self.client.force_authenticate(recipient)
+        changed, _, token = self.sync()
+        self.assertEqual(changed, [todo_id])
+
+        self.client.force_authenticate(self.user)
+        self.client.delete(f"/api/todos/{todo_id}/")
+
+        self.client.force_authenticate(recipient)
+        self.assertEqual(self.sync(token)[:2], ([], [todo_id]))
+
+    def test_pruned_token_requires_resync(self):
+        todo_id = self.create("Xoá")
+        token = self.sync()[2]
+        self.client.delete(f"/api/todos/{todo_id}/")
+
+        self.assertEqual(prune_deletions(timezone.now() + timedelta(seconds=1)), 1)
+        response = self.client.get("/api/todos/changes/", {"since": token})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data["resync"])
+
+        # Đồng bộ lại từ đầu thì dùng tiếp được
+        self.assertEqual(self.sync()[:2], ([], []))
+
+    def test_invalid_token(self):
+        response = self.client.get("/api/todos/changes/", {"since": "không-hợp-lệ"})
+        self.assertEqual(response.status_code, 400)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("son", "son@example.com", "pw")
+        User.objects.create_user("tam", "tam@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.todo = Todo.objects.create(owner=self.owner, title="Việc chung")
+
+    def share(self):
+        return self.client.post(
+            "/api/todos/share/",
+            {"todo_id": self.todo.id, "shared_to_email": "tam@example.com"},
+            format="json",
+        )
+
+    def test_share_queues_email_instead_of_sending(self):
+        self.assertEqual(self.share().status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to_email, "tam@example.com")
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+
+    def test_each_email_is_sent_once(self):
+        self.share()
+        self.share()
+
+        self.assertEqual(outbox.drain_outbox(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        # Lần chạy sau (hoặc worker khác) không gửi lại
+        self.assertEqual(outbox.drain_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_claimed_batch_is_not_claimed_twice(self):
+        self.share()
+        claimed = outbox.claim_batch()
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(outbox.claim_batch(), [])
+
+        # Worker giữ chỗ đã chết: hết hạn giữ chỗ thì worker khác lấy lại
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual([email.id for email in outbox.claim_batch()], [claimed[0].id])
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.share()
+        connection = mock.Mock()
+        connection.send_messages.side_effect = OSError("SMTP lỗi")
+
+        before = timezone.now()
+        self.assertEqual(outbox.send_batch(outbox.claim_batch(), connection=connection), (0, 1))
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreaterEqual(email.next_attempt_at, before + outbox.retry_delay(1))
+        # Chưa đến lượt retry
+        self.assertEqual(outbox.claim_batch(), [])
+
+        OutboundEmail.objects.update(attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        outbox.send_batch(outbox.claim_batch(), connection=connection)
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_FAILED)
+
+
+class ReminderClaimTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("uyen", "uyen@example.com", "pw")
+        self.now = timezone.now()
+        self.todo = Todo.objects.create(
+            owner=self.user, title="Nộp báo cáo", due_at=self.now + timedelta(minutes=30)
+        )
+        self.setting = NotificationSetting.objects.create(
+            owner=self.user, todo=self.todo, reminder_minutes=60
+        )
+
+    def send(self):
+        return reminders.send_reminders(reminders.due_reminders(self.now), self.now)
+
+    def test_reminder_is_sent_once(self):
+        self.assertEqual(self.send(), (1, 0))
+        self.assertEqual(self.send(), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(SentNotification.objects.count(), 1)
+
+    def test_claim_is_idempotent(self):
+        # Process khác đã đọc cấu hình trước khi last_sent_at được đặt: vẫn chỉ 1 phiếu
+        rows = [(self.todo.id, self.setting.id)]
+        kind = SentNotification.KIND_REMINDER
+        self.assertEqual(reminders.claim_notifications(rows, kind), set(rows))
+        self.assertEqual(reminders.claim_notifications(rows, kind), set())
+
+        today = timezone.localdate()
+        rows = [(self.todo.id, None)]
+        kind = SentNotification.KIND_DAILY
+        self.assertEqual(reminders.claim_notifications(rows, kind, today), set(rows))
+        self.assertEqual(reminders.claim_notifications(rows, kind, today), set())
+
+    def test_failed_reminder_is_released(self):
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=OSError("SMTP lỗi"),
+        ):
+            self.assertEqual(self.send(), (0, 1))
+        self.assertFalse(SentNotification.objects.exists())
+
+        self.assertEqual(self.send(), (1, 0))
+
+    def test_daily_digest_is_sent_once_per_day(self):
+        reminder_time = timezone.localtime(self.now).time().replace(second=0, microsecond=0)
+        Todo.objects.filter(pk=self.todo.pk).update(daily_reminder_time=reminder_time)
+        Todo.objects.create(owner=self.user, title="Tập thể dục", daily_reminder_time=reminder_time)
+
+        self.assertEqual(reminders.send_daily_reminders(self.now), (1, 0))
+        self.assertEqual(reminders.send_daily_reminders(self.now), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("2 công việc", mail.outbox[0].subject)
+
+
+class DestroyTests(StatsAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("dave", "dave@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stale_instance_is_deleted_once(self):
+        todo_id = self.client.post(
+            "/api/todos/", {"title": "Xoá", "priority": "High"}, format="json"
+        ).data["id"]
+        # 2 request DELETE đã đọc todo trước khi todo được đánh dấu xong
+        stale = [Todo.objects.get(pk=todo_id) for _ in range(2)]
+        self.client.patch(f"/api/todos/{todo_id}/toggle-status/")
+
+        view = TodoViewSet()
+        for instance in stale:
+            view.perform_destroy(instance)
+
+        self.assertFalse(Todo.objects.filter(pk=todo_id).exists())
+        self.assertEqual(DeletedTodo.objects.filter(todo_id=todo_id).count(), 1)
+        self.assertStatsConsistent(self.user)
+
+
+class SharedTodoCategoryTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("erin", "erin@example.com", "pw")
+        self.editor = User.objects.create_user("frank", "frank@example.com", "pw")
+        self.todo = Todo.objects.create(owner=self.owner, title="Việc chung")
+        TaskShare.objects.create(
+            task=self.todo,
+            shared_by=self.owner,
+            shared_to=self.editor,
+            permission="edit",
+            share_link="share-edit",
+            accepted=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.editor)
+
+    def test_editor_cannot_attach_foreign_category(self):
+        foreign = Category.objects.create(owner=self.editor, name="Của Frank")
+        response = self.client.patch(
+            f"/api/todos/{self.todo.id}/", {"category": foreign.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.todo.refresh_from_db()
+        self.assertIsNone(self.todo.category_id)
+
+    def test_editor_can_use_owner_category(self):
+        category = Category.objects.create(owner=self.owner, name="Của Erin")
+        response = self.client.patch(
+            f"/api/todos/{self.todo.id}/", {"category": category.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["category_name"], "Của Erin")
+
+
+class ChatbotHourDurationTests(TestCase):
+    def setUp(self):
+        self.chatbot = TaskChatbot()
+
+    def test_hour_pattern_priority(self):
+        cases = {
+            "họp 9:30 rồi lúc 14h": 14,  # "lúc 14h" thắng dù đứng sau
+            "8pm hoặc 10h": 10,  # "10h" thắng "8pm"
+            "at 7 hay 9:15": 7,
+            "gọi lúc 25h, lúc 8": 8,  # giờ ngoài 0..23 thì xét mẫu kế tiếp
+            "gặp 12am": 0,
+            "gặp 3pm": 15,
+            "mua sữa": None,
+        }
+        for message, hour in cases.items():
+            with self.subTest(message=message):
+                self.assertEqual(self.chatbot._extract_hour(message), hour)
+
+    def test_duration(self):
+        self.assertEqual(self.chatbot._extract_duration("chạy 30 phút rồi 2 tiếng"), 120)
+        self.assertEqual(self.chatbot._extract_duration("nghỉ 15 min"), 15)
+        self.assertEqual(self.chatbot._extract_duration("lúc 14h"), 60)
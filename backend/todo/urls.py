@@ -9,10 +9,14 @@ from .views import (
     ReportViewSet,
     NotificationSettingViewSet,
     predict_task_completion,
+    predict_task_batch,
     chatbot_create_task,
+    chatbot_create_tasks_batch,
     PublicLoginView,
     PublicRegisterView,
     accept_share,
+    todo_stream,
+    todo_stream_ticket,
 )
 
 router = DefaultRouter()
@@ -27,17 +31,39 @@ router.register(
 
 urlpatterns = [
     # API AI - Đặt TRƯỚC router để tránh conflict
+    path(
+        "predict/batch/",
+        predict_task_batch,
+        name="predict-task-batch",
+    ),
     path(
         "predict/",
         predict_task_completion,
         name="predict-task",
     ),
+    path(
+        "chatbot/batch/",
+        chatbot_create_tasks_batch,
+        name="chatbot-create-tasks-batch",
+    ),
     path(
         "chatbot/",
         chatbot_create_task,
         name="chatbot-create-task",
     ),
-    
+
+    # SSE (view async) – đặt trước router để không bị hiểu là todos/<pk>/
+    path(
+        "todos/stream/ticket/",
+        todo_stream_ticket,
+        name="todos-stream-ticket",
+    ),
+    path(
+        "todos/stream/",
+        todo_stream,
+        name="todos-stream",
+    ),
+
     # Routers cơ bản (CRUD todo, category, report, notification)
     path("", include(router.urls)),
 
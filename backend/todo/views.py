@@ -1,24 +1,48 @@
 # todo/views.py
 from datetime import datetime, timedelta
+import asyncio
+import base64
+import binascii
 import csv
+import hashlib
 import io
 import json
+import re
 import uuid
-
-from django.db import models
-from django.db.models import Q, ProtectedError, Count
-from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
+from collections import Counter
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections, models, transaction
+from django.db.models import Q, F, Exists, Func, OuterRef, ProtectedError, Count, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    HttpResponse,
+    JsonResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.core.mail import send_mail
 from django.conf import settings
 
 from rest_framework import status, viewsets, filters
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, BasePermission, SAFE_METHODS
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.parsers import MultiPartParser, FormParser
 from dj_rest_auth.views import LoginView
 from dj_rest_auth.registration.views import RegisterView
 
@@ -32,6 +56,8 @@ from .models import (
     CalendarEvent,
     NotificationSetting,
     SentNotification,
+    Tag,
+    TodoTag,
 )
 from .serializers import (
     TodoSerializer,
@@ -40,22 +66,150 @@ from .serializers import (
     CalendarEventSerializer,
     NotificationSettingSerializer,
 )
-from .services.ai import predict_task_on_time
+from .services.ai import (
+    DEFAULT_MODEL_NAME,
+    features_from_task,
+    predict_task_on_time,
+    predict_tasks_on_time,
+    quantize_features,
+    registry,
+)
 from .services.chatbot import TaskChatbot
+from .services.outbox import enqueue_email
+from .services.csv_io import iter_todo_csv, import_todos_csv
+from .services.user_cache import (
+    bump_user_version,
+    cached_report,
+    get_user_version,
+    user_cache_key,
+)
+from .services.tags import split_tags, sync_todo_tags
+from .services.sync import (
+    CHANGES_MAX_PAGE_SIZE,
+    CHANGES_PAGE_SIZE,
+    InvalidSyncToken,
+    SyncTokenExpired,
+    changes_since,
+    record_deletions,
+    todo_audience,
+    visible_todos,
+)
+from .services.events import get_broker, publish_resync, publish_todo_events
+from .services.stats import (
+    PRIORITY_PREFIX,
+    apply_stats_delta,
+    get_user_stats,
+    todo_change_delta,
+    todo_stats_delta,
+)
+
+
+# ============== Conditional GET (ETag) ==============
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+    def __init__(self, etag):
+        super().__init__()
+        self.etag = etag
+
+
+class ConditionalGetMixin:
+    """
+    ETag theo version cache của user (tăng ở mọi thao tác ghi, xem
+    bump_user_version) + URL đầy đủ + định dạng trả về.
+    Version chỉ là 1 lần đọc cache nên được so với If-None-Match ngay trong
+    initial(), trước khi chạy query chính: khớp thì trả 304 không body.
+    """
+    # Các action GET được hỗ trợ ETag
+    conditional_actions = ()
+
+    def get_etag(self, request):
+        version = get_user_version(request.user.id)
+        if version is None:
+            # Backend cache không đánh version an toàn được: không dùng ETag
+            return None
+        # Có user trong hash: 2 user cùng version trên cùng URL không trùng ETag
+        raw = "|".join(
+            [
+                str(request.user.pk),
+                str(version),
+                request.get_full_path(),
+                request.accepted_media_type or "",
+            ]
+        )
+        return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method in ("GET", "HEAD") and self.action in self.conditional_actions:
+            self.etag = self.get_etag(request)
+            if self.etag is None:
+                return
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            if self.etag in if_none_match or "*" in if_none_match:
+                raise NotModified(self.etag)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": exc.etag})
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "etag", None) and response.status_code in (200, 304):
+            response["ETag"] = self.etag
+            # Dữ liệu riêng của từng user: cache trung gian không được dùng chung
+            response["Cache-Control"] = "private, no-cache"
+        return response
 
 
 # ============== Category ==============
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None  # Tắt pagination cho categories
+    conditional_actions = ("list", "retrieve")
 
     def get_queryset(self):
         return Category.objects.filter(owner=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
+        bump_user_version(self.request.user.id)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            category = serializer.save()
+            audience = self._touch_todos(category)
+        self._clear_audience_cache(audience)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # SET_NULL chạy bằng UPDATE nên không tự cập nhật updated_at
+            audience = self._touch_todos(instance)
+            instance.delete()
+        self._clear_audience_cache(audience)
+
+    def _touch_todos(self, category):
+        """
+        category_name nằm trong dữ liệu todo, kể cả todo đã share cho người khác:
+        đánh dấu để /todos/changes/ trả lại và báo "updated" cho mọi user đang
+        thấy các todo này. Trả về audience (tập (todo_id, user_id)).
+        """
+        todos = Todo.objects.filter(category=category)
+        audience = todo_audience(todos.values_list("id", "owner_id"))
+        todos.update(updated_at=timezone.now())
+        publish_todo_events("updated", audience)
+        return audience
+
+    def _clear_audience_cache(self, audience):
+        # Owner luôn đổi (danh sách category), người nhận share đổi category_name
+        user_ids = {self.request.user.id} | {user_id for _, user_id in audience}
+        for user_id in user_ids:
+            bump_user_version(user_id)
 
 
 # ============== Notification Setting ==============
@@ -76,8 +230,25 @@ class NotificationSettingViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
+# ============== Helpers ==============
+
+def _parse_date_param(value, name, required=True):
+    """Parse query param dạng YYYY-MM-DD; raise ValueError nếu sai (hoặc thiếu khi required)."""
+    if not value and not required:
+        return None
+    try:
+        parsed = parse_date(value) if value else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{name} phải có dạng YYYY-MM-DD")
+    return parsed
+
+
 # ============== Todo ==============
 
+TAGS_MAX_LENGTH = Todo._meta.get_field("tags").max_length
+
 # Custom pagination class
 class TodoPagination(PageNumberPagination):
     page_size = 50
@@ -85,41 +256,354 @@ class TodoPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class TodoViewSet(viewsets.ModelViewSet):
+class TodoKeysetPagination(BasePagination):
+    """
+    Phân trang theo con trỏ (keyset) trên (cột sắp xếp, id), bật bằng ?cursor=.
+    Không COUNT(*) và không OFFSET nên trang sâu vẫn tốn như trang đầu.
+    Sắp xếp hỗ trợ: created_at, due_at, priority (thêm "-" để giảm dần).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    default_ordering = '-created_at'
+    ordering_fields = ("created_at", "due_at", "priority")
+    # Các cột có thể NULL: luôn xếp NULL cuối cùng
+    nullable_fields = ("due_at",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request)
+
+        queryset = queryset.order_by(*self.get_order_by())
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(*position))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request):
+        raw = request.query_params.get(self.ordering_query_param, "")
+        # Chỉ lấy cột đầu tiên hợp lệ; id luôn là cột phụ để thứ tự ổn định
+        for term in raw.split(","):
+            term = term.strip()
+            if term.lstrip("-") in self.ordering_fields:
+                return term.lstrip("-"), term.startswith("-")
+        return self.default_ordering.lstrip("-"), self.default_ordering.startswith("-")
+
+    def get_order_by(self):
+        if self.descending:
+            primary = F(self.field).desc(nulls_last=True)
+            return [primary, "-id"]
+        return [F(self.field).asc(nulls_last=True), "id"]
+
+    def get_position_filter(self, value, pk):
+        op = "lt" if self.descending else "gt"
+        id_after = Q(**{f"id__{op}": pk})
+        if value is None:
+            # Đang ở vùng NULL (cuối danh sách): chỉ còn so theo id
+            return Q(**{f"{self.field}__isnull": True}) & id_after
+        after = Q(**{f"{self.field}__{op}": value}) | (Q(**{self.field: value}) & id_after)
+        if self.field in self.nullable_fields:
+            after |= Q(**{f"{self.field}__isnull": True})
+        return after
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            value, pk = payload["v"], int(payload["id"])
+            if value is not None and self.field in ("created_at", "due_at"):
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError, binascii.Error):
+            raise NotFound("Cursor không hợp lệ")
+        return value, pk
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.field)
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        payload = json.dumps({"v": value, "id": obj.pk}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+
+class TodoSearchFilter(filters.SearchFilter):
+    """
+    PostgreSQL: full-text search trên cột generated search_vector (GIN index,
+    xem migration 0007), không phân biệt dấu tiếng Việt nhờ unaccent, khớp
+    tiền tố từng từ và xếp theo SearchRank khi không có ?ordering=.
+    DB khác (SQLite khi chạy test): giữ nguyên SearchFilter (icontains).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        words = [
+            word
+            for term in self.get_search_terms(request)
+            for word in re.findall(r"\w+", term)
+        ]
+        if not words:
+            return queryset
+
+        # "hoc:* & python:*" -> khớp tiền tố, giống hành vi "chứa" của icontains
+        raw_query = " & ".join(f"{word}:*" for word in words)
+        query = SearchQuery(
+            Func(Value(raw_query), function="todo_unaccent", output_field=TextField()),
+            config="simple",
+            search_type="raw",
+        )
+        vector = RawSQL(
+            f'"{Todo._meta.db_table}"."search_vector"',
+            [],
+            output_field=SearchVectorField(),
+        )
+        queryset = queryset.alias(search_vector=vector).filter(search_vector=query)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.annotate(rank=SearchRank(vector, query)).order_by(
+            "-rank", "-created_at", "-id"
+        )
+
+
+class TodoTagFilter(filters.BaseFilterBackend):
+    """
+    ?tags=a,b -> chỉ lấy todo có đủ tất cả các thẻ, lọc qua bảng TodoTag
+    (index theo todo) thay vì tìm chuỗi con trong Todo.tags.
+    Thẻ thuộc owner của todo, nên không lọc theo request.user: todo được share
+    (?include_shared=1) mang thẻ của người share.
+    """
+    tags_param = "tags"
+
+    def filter_queryset(self, request, queryset, view):
+        names = split_tags(request.query_params.get(self.tags_param, ""))
+        for name in names:
+            queryset = queryset.filter(
+                Exists(TodoTag.objects.filter(todo=OuterRef("pk"), tag__name=name))
+            )
+        return queryset
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter luôn thêm id làm cột phụ để thứ tự giữa các trang ổn định,
+    và xếp NULL cuối cùng (giống TodoKeysetPagination) cho cột có thể NULL.
+    """
+    nullable_fields = TodoKeysetPagination.nullable_fields
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not any(term.lstrip("-") in ("id", "pk") for term in ordering):
+            tie_breaker = "-id" if ordering[-1].startswith("-") else "id"
+            ordering = list(ordering) + [tie_breaker]
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        order_by = []
+        for term in ordering:
+            field = term.lstrip("-")
+            if field in self.nullable_fields:
+                expr = F(field)
+                term = expr.desc(nulls_last=True) if term.startswith("-") else expr.asc(nulls_last=True)
+            order_by.append(term)
+        return queryset.order_by(*order_by)
+
+
+class TodoSharePermission(BasePermission):
+    """
+    Task được share: quyền "view" chỉ được đọc, quyền "edit" được sửa.
+    Xoá vẫn chỉ owner (queryset của destroy không gồm task được share).
+    """
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS:
+            return True
+        return getattr(obj, "permission", "owner") in ("owner", "edit")
+
+
+# Số dòng CSV đọc mỗi lần (1 lần chuyển sang thread) khi stream export dưới ASGI
+EXPORT_ASGI_LINES = 500
+
+
+async def _aiter_chunks(iterator, size):
+    """
+    Bọc iterator sync (có truy vấn DB) thành iterator async: mỗi lần lấy tối
+    đa `size` phần tử trong thread của request (sync_to_async, thread_sensitive)
+    nên server-side cursor vẫn dùng đúng connection và không dựng cả nội dung.
+    """
+    next_chunk = sync_to_async(lambda: list(islice(iterator, size)))
+    try:
+        while True:
+            chunk = await next_chunk()
+            if not chunk:
+                break
+            yield "".join(chunk)
+    finally:
+        # Chạy finally của generator sync (vd cập nhật ExportLog) trong thread
+        await sync_to_async(iterator.close)()
+
+
+class TodoViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = TodoSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, TodoSharePermission]
     pagination_class = TodoPagination
+    conditional_actions = ("list", "retrieve", "tags")
 
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
+        TodoTagFilter,
+        TodoSearchFilter,
+        StableOrderingFilter,
     ]
     search_fields = ["title", "description", "tags"]
     filterset_fields = ["created_at", "due_at", "priority", "category", "completed"]
     ordering_fields = ["created_at", "due_at", "priority"]
 
+    # Các action trên 1 task mà người nhận share (đã chấp nhận) cũng dùng được
+    SHARED_ACTIONS = ("retrieve", "update", "partial_update", "toggle_status")
+
+    def _include_shared(self):
+        if self.action in self.SHARED_ACTIONS:
+            return True
+        return self.action == "list" and self.request.query_params.get(
+            "include_shared", ""
+        ).lower() in ("1", "true")
+
     def get_queryset(self):
+        # ?include_shared=1: task của mình + task được share, kèm permission
+        if self._include_shared():
+            queryset = visible_todos(self.request.user)
+        else:
+            queryset = Todo.objects.filter(owner=self.request.user)
         # Tối ưu query với select_related
-        return (
-            Todo.objects.filter(owner=self.request.user)
-            .select_related("category", "owner")
-            .order_by("-created_at")
-        )
+        return queryset.select_related("category", "owner").order_by("-created_at", "-id")
+
+    @property
+    def paginator(self):
+        # ?cursor= bật chế độ keyset, mặc định vẫn là phân trang theo số trang
+        if not hasattr(self, "_paginator"):
+            if TodoKeysetPagination.cursor_query_param in self.request.query_params:
+                self._paginator = TodoKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
+        with transaction.atomic():
+            todo = serializer.save(owner=self.request.user)
+            apply_stats_delta(todo.owner_id, todo_stats_delta(todo.priority, todo.completed))
+            if todo.tags:
+                sync_todo_tags([todo])
+            publish_todo_events("created", {(todo.id, todo.owner_id)})
         self._clear_user_cache(self.request.user.id)
     
     def perform_update(self, serializer):
-        serializer.save()
-        self._clear_user_cache(self.request.user.id)
+        instance = serializer.instance
+        with transaction.atomic():
+            # Khoá dòng rồi mới đọc giá trị cũ: 2 request sửa cùng lúc không
+            # cùng áp 1 delta thống kê cho cùng 1 thay đổi
+            row = (
+                Todo.objects.select_for_update()
+                .filter(pk=instance.pk)
+                .values_list("priority", "completed", "tags")
+                .first()
+            )
+            if row is None:
+                # Bị xoá giữa get_object() và lúc khoá
+                raise NotFound()
+            old_priority, old_completed, old_tags = row
+            # Field không có trong request giữ giá trị mới nhất đã khoá
+            instance.priority, instance.completed, instance.tags = (
+                old_priority,
+                old_completed,
+                old_tags,
+            )
+            todo = serializer.save()
+            apply_stats_delta(
+                todo.owner_id,
+                todo_change_delta(old_priority, old_completed, todo.priority, todo.completed),
+            )
+            if todo.tags != old_tags:
+                sync_todo_tags([todo])
+            audience = todo_audience([(todo.id, todo.owner_id)])
+            publish_todo_events("updated", audience)
+        # Người sửa có thể là người nhận share: xoá cache của owner và mọi người nhận
+        self._clear_audience_cache(audience)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Khoá dòng rồi mới đọc giá trị hiện tại: 2 DELETE cùng lúc không trừ
+            # thống kê 2 lần, DELETE chen với toggle/sửa không trừ nhầm nhóm
+            row = (
+                Todo.objects.select_for_update()
+                .filter(pk=instance.pk)
+                .values_list("priority", "completed")
+                .first()
+            )
+            if row is None:
+                # Request khác vừa xoá xong
+                return
+            priority, completed = row
+            # Tính trước khi xoá (TaskShare bị xoá theo CASCADE)
+            audience = todo_audience([(instance.id, instance.owner_id)])
+            _, deleted = instance.delete()
+            if not deleted.get(Todo._meta.label):
+                return
+            record_deletions(audience)
+            publish_todo_events("deleted", audience)
+            apply_stats_delta(
+                instance.owner_id,
+                todo_stats_delta(priority, completed, sign=-1),
+            )
+        self._clear_audience_cache(audience)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         try:
             self.perform_destroy(instance)
-            self._clear_user_cache(request.user.id)
         except Exception as e:
             print("ERROR_WHEN_DELETING_TODO:", repr(e))
             return Response(
@@ -134,17 +618,465 @@ class TodoViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["patch"], url_path="toggle-status")
     def toggle_status(self, request, pk=None):
         todo = self.get_object()
-        todo.completed = not todo.completed
-        todo.save()
+        with transaction.atomic():
+            # Đọc lại dưới khoá: 2 lần toggle cùng lúc phải đảo trạng thái 2 lần
+            row = (
+                Todo.objects.select_for_update()
+                .filter(pk=todo.pk)
+                .values_list("priority", "completed")
+                .first()
+            )
+            if row is None:
+                raise NotFound()
+            todo.priority, completed = row
+            todo.completed = not completed
+            todo.save()
+            apply_stats_delta(
+                todo.owner_id,
+                todo_change_delta(todo.priority, not todo.completed, todo.priority, todo.completed),
+            )
+            audience = todo_audience([(todo.id, todo.owner_id)])
+            publish_todo_events("updated", audience)
         # Clear cache
-        self._clear_user_cache(request.user.id)
+        self._clear_audience_cache(audience)
         serializer = self.get_serializer(todo, context={"request": request})
         return Response(serializer.data)
     
     def _clear_user_cache(self, user_id):
-        from django.core.cache import cache
-        cache.delete(f"report_{user_id}_progress")
-        cache.delete(f"report_{user_id}_priority")
+        # Tăng version của user: mọi key report cũ hết hiệu lực trên tất cả worker
+        bump_user_version(user_id)
+
+    def _clear_audience_cache(self, audience):
+        # audience: tập (todo_id, user_id) từ todo_audience()
+        for user_id in {user_id for _, user_id in audience}:
+            self._clear_user_cache(user_id)
+
+    BULK_MAX_IDS = 1000
+    BULK_OPERATIONS = (
+        "complete",
+        "uncomplete",
+        "set_priority",
+        "set_category",
+        "add_tags",
+        "delete",
+    )
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        POST /api/todos/bulk/
+        body: {
+          "ids": [1, 2, 3],
+          "operation": "complete" | "uncomplete" | "set_priority" | "set_category" | "add_tags" | "delete",
+          "value": "High" (set_priority) | category_id/null (set_category) | ["a", "b"] (add_tags)
+        }
+        Chạy 1 câu UPDATE/DELETE trên các task của user trong 1 transaction,
+        xoá cache 1 lần, trả về danh sách id bị ảnh hưởng.
+        """
+        ids = request.data.get("ids")
+        operation = request.data.get("operation")
+        value = request.data.get("value")
+
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {"error": "ids phải là danh sách khác rỗng"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "ids chỉ chứa số nguyên"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > self.BULK_MAX_IDS:
+            return Response(
+                {"error": f"Tối đa {self.BULK_MAX_IDS} task mỗi lần"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if operation not in self.BULK_OPERATIONS:
+            return Response(
+                {"error": f"operation phải là một trong: {', '.join(self.BULK_OPERATIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if operation == "set_priority":
+            if not isinstance(value, str) or value not in dict(Todo.PRIORITY_CHOICES):
+                return Response(
+                    {"error": "Mức ưu tiên không hợp lệ"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        elif operation == "set_category":
+            # bool là lớp con của int nhưng không phải id hợp lệ
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                return Response(
+                    {"error": "value phải là id danh mục hoặc null"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if value is not None and not Category.objects.filter(
+                owner=request.user, id=value
+            ).exists():
+                return Response(
+                    {"error": "Danh mục không tồn tại"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        elif operation == "add_tags":
+            if not isinstance(value, list) or not all(isinstance(tag, str) for tag in value):
+                return Response(
+                    {"error": "value phải là mảng tên thẻ"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            value = split_tags(",".join(value))
+            if not value:
+                return Response(
+                    {"error": "Cần ít nhất 1 thẻ"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        queryset = Todo.objects.filter(owner=request.user, id__in=ids)
+        # update()/bulk_update() không tự gán auto_now
+        now = timezone.now()
+        with transaction.atomic():
+            # Khoá các dòng để delta thống kê khớp với dữ liệu bị sửa
+            rows = list(
+                queryset.select_for_update().values_list("id", "priority", "completed", "tags")
+            )
+            affected = [row[0] for row in rows]
+            # Các task thực sự thay đổi (để gửi sự kiện realtime)
+            changed_ids = affected
+            delta = Counter()
+
+            if operation in ("complete", "uncomplete"):
+                target = operation == "complete"
+                changed = [row for row in rows if row[2] != target]
+                changed_ids = [row[0] for row in changed]
+                if changed:
+                    Todo.objects.filter(id__in=[row[0] for row in changed]).update(
+                        completed=target, updated_at=now
+                    )
+                for _, priority, completed, _ in changed:
+                    delta.update(todo_change_delta(priority, completed, priority, target))
+
+            elif operation == "set_priority":
+                changed = [row for row in rows if row[1] != value]
+                changed_ids = [row[0] for row in changed]
+                if changed:
+                    Todo.objects.filter(id__in=[row[0] for row in changed]).update(
+                        priority=value, updated_at=now
+                    )
+                for _, priority, completed, _ in changed:
+                    delta.update(todo_change_delta(priority, completed, value, completed))
+
+            elif operation == "set_category":
+                if affected:
+                    Todo.objects.filter(id__in=affected).update(category_id=value, updated_at=now)
+
+            elif operation == "add_tags":
+                todos = []
+                for pk, _, _, tags in rows:
+                    current = split_tags(tags)
+                    merged = current + [tag for tag in value if tag not in current]
+                    if merged != current:
+                        todos.append(
+                            Todo(
+                                id=pk,
+                                owner_id=request.user.id,
+                                tags=", ".join(merged),
+                                updated_at=now,
+                            )
+                        )
+                too_long = [todo.id for todo in todos if len(todo.tags) > TAGS_MAX_LENGTH]
+                if too_long:
+                    transaction.set_rollback(True)
+                    return Response(
+                        {"error": "Chuỗi thẻ vượt quá độ dài cho phép", "ids": too_long},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                changed_ids = [todo.id for todo in todos]
+                if todos:
+                    Todo.objects.bulk_update(todos, ["tags", "updated_at"])
+                    sync_todo_tags(todos)
+
+            audience = todo_audience((pk, request.user.id) for pk in changed_ids)
+            if operation == "delete":
+                if affected:
+                    record_deletions(audience)
+                    Todo.objects.filter(id__in=affected).delete()
+                for _, priority, completed, _ in rows:
+                    delta.update(todo_stats_delta(priority, completed, sign=-1))
+
+            apply_stats_delta(request.user.id, delta)
+            publish_todo_events("deleted" if operation == "delete" else "updated", audience)
+
+        self._clear_audience_cache(audience)
+
+        found = set(affected)
+        return Response(
+            {
+                "operation": operation,
+                "ids": affected,
+                "count": len(affected),
+                "not_found": [pk for pk in ids if pk not in found],
+            }
+        )
+
+    @action(detail=False, methods=["get"], url_path="changes")
+    def changes(self, request):
+        """
+        GET /api/todos/changes/?since=<token>&page_size=200
+        Delta sync: chỉ trả các task (của mình + được share) tạo/sửa và id các
+        task bị xoá kể từ token. Không có since = đồng bộ lần đầu.
+        Gọi lại với "next" đến khi has_more = false, lần poll sau dùng "next" cuối.
+        410 (resync = true): token cũ hơn thời gian giữ tombstone, đồng bộ lại từ đầu.
+        """
+        try:
+            page_size = int(request.query_params.get("page_size", CHANGES_PAGE_SIZE))
+        except (TypeError, ValueError):
+            page_size = CHANGES_PAGE_SIZE
+        page_size = max(1, min(page_size, CHANGES_MAX_PAGE_SIZE))
+
+        try:
+            todos, deleted, token, has_more = changes_since(
+                request.user, request.query_params.get("since"), page_size
+            )
+        except SyncTokenExpired as e:
+            return Response({"error": str(e), "resync": True}, status=status.HTTP_410_GONE)
+        except InvalidSyncToken as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {
+                "changed": self.get_serializer(todos, many=True).data,
+                "deleted": deleted,
+                "next": token,
+                "has_more": has_more,
+            }
+        )
+
+    @action(detail=False, methods=["get"], url_path="tags")
+    def tags(self, request):
+        """
+        GET /api/todos/tags/
+        Danh sách thẻ của user kèm số task, 1 query gom nhóm trên TodoTag.
+        """
+        tags = (
+            Tag.objects.filter(owner=request.user)
+            .annotate(count=Count("todo_tags"))
+            .filter(count__gt=0)
+            .order_by("-count", "name")
+            .values("id", "name", "count")
+        )
+        return Response(list(tags))
+
+    # =========== CSV IMPORT / EXPORT ===========
+
+    @action(detail=False, methods=["get"], url_path="export-csv")
+    def export_csv(self, request):
+        """
+        GET /api/todos/export-csv/?priority=High&search=abc
+        - Dùng chung filter/search/ordering với list endpoint
+        - Stream từng dòng từ server-side cursor, không dựng cả file trong RAM
+        - Ghi lại ExportLog với exported_count
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+
+        filename = f"todos_{timezone.localtime():%Y%m%d_%H%M%S}.csv"
+        export_log = ExportLog.objects.create(
+            user=request.user,
+            format="csv",
+            file_path=filename,
+        )
+
+        def stream():
+            exported = 0
+            try:
+                for index, line in enumerate(iter_todo_csv(queryset)):
+                    if index:
+                        exported += 1
+                    yield line
+            finally:
+                # Cập nhật số dòng khi stream kết thúc (kể cả khi client ngắt giữa chừng)
+                ExportLog.objects.filter(pk=export_log.pk).update(
+                    exported_count=exported
+                )
+
+        content = stream()
+        if isinstance(request._request, ASGIRequest):
+            # Dưới ASGI Django gom iterator sync bằng sync_to_async(list) (cả file
+            # trong RAM): chuyển sang iterator async đọc từng khối trong thread
+            content = _aiter_chunks(content, EXPORT_ASGI_LINES)
+        response = StreamingHttpResponse(content, content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import-csv",
+        parser_classes=[MultiPartParser, FormParser],
+    )
+    def import_csv(self, request):
+        """
+        POST /api/todos/import-csv/  (multipart, field "file")
+        Cột hỗ trợ: title (bắt buộc), description, category, priority,
+        due_at, remind_at, completed, tags, daily_reminder_time.
+        Trả về số task đã tạo và danh sách lỗi theo từng dòng.
+        """
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response(
+                {"error": "Thiếu file CSV (field 'file')"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Đọc dần từ file upload, không đọc cả file vào bộ nhớ
+        text_stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            result = import_todos_csv(request.user, text_stream)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return Response(
+                {"error": "File CSV không hợp lệ", "detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        finally:
+            # Không để TextIOWrapper đóng file gốc của Django
+            text_stream.detach()
+
+        if result["created"]:
+            self._clear_user_cache(request.user.id)
+            publish_resync(request.user.id)
+
+        return Response(
+            result,
+            status=status.HTTP_201_CREATED if result["created"] else status.HTTP_200_OK,
+        )
+
+    # =========== LỊCH ===========
+
+    # Giới hạn khoảng ngày cho 1 request calendar
+    CALENDAR_MAX_DAYS = 366
+
+    @staticmethod
+    def _local_day_range(start_date, end_date):
+        """[00:00 ngày start, 00:00 ngày sau end) theo giờ địa phương, để lọc due_at theo index."""
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()), tz)
+        end = timezone.make_aware(
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time()), tz
+        )
+        return start, end
+
+    @action(detail=False, methods=["get"], url_path="calendar")
+    def calendar(self, request):
+        """
+        GET /api/todos/calendar/?start_date=2025-12-01&end_date=2025-12-31
+        Trả về bucket theo từng ngày: số task đến hạn, số task đã xong và
+        các CalendarEvent trong ngày. Mặc định là tháng hiện tại.
+        """
+        today = timezone.localdate()
+        try:
+            start_date = _parse_date_param(
+                request.query_params.get("start_date") or today.replace(day=1).isoformat(),
+                "start_date",
+            )
+            default_end = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+            end_date = _parse_date_param(
+                request.query_params.get("end_date") or default_end.isoformat(),
+                "end_date",
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if end_date < start_date:
+            return Response(
+                {"error": "end_date phải sau start_date"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (end_date - start_date).days >= self.CALENDAR_MAX_DAYS:
+            return Response(
+                {"error": f"Khoảng ngày tối đa {self.CALENDAR_MAX_DAYS} ngày"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user = request.user
+        range_start, range_end = self._local_day_range(start_date, end_date)
+
+        # 1 query: gom nhóm theo ngày đến hạn (giờ địa phương) ngay trong DB
+        day_stats = (
+            Todo.objects.filter(owner=user, due_at__gte=range_start, due_at__lt=range_end)
+            .annotate(day=TruncDate("due_at", tzinfo=timezone.get_current_timezone()))
+            .values("day")
+            .annotate(
+                total=Count("id"),
+                completed=Count("id", filter=Q(completed=True)),
+            )
+            .order_by("day")
+        )
+
+        # 1 query: sự kiện trong khoảng ngày, kèm todo để tránh N+1
+        events = (
+            CalendarEvent.objects.filter(user=user, date__gte=start_date, date__lte=end_date)
+            .select_related("todo")
+            .order_by("date", "start_time")
+        )
+
+        buckets = {}
+        for offset in range((end_date - start_date).days + 1):
+            day = start_date + timedelta(days=offset)
+            buckets[day.isoformat()] = {
+                "date": day.isoformat(),
+                "total": 0,
+                "completed": 0,
+                "events": [],
+            }
+
+        for stat in day_stats:
+            bucket = buckets.get(stat["day"].isoformat())
+            if bucket is not None:
+                bucket["total"] = stat["total"]
+                bucket["completed"] = stat["completed"]
+
+        for event_data in CalendarEventSerializer(events, many=True).data:
+            buckets[event_data["date"]]["events"].append(event_data)
+
+        return Response(
+            {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "days": list(buckets.values()),
+            }
+        )
+
+    @action(detail=False, methods=["get"], url_path="tasks-by-date")
+    def tasks_by_date(self, request):
+        """
+        GET /api/todos/tasks-by-date/?date=2025-12-24
+        Các task đến hạn trong ngày (giờ địa phương) và các CalendarEvent của ngày đó.
+        """
+        try:
+            day = _parse_date_param(request.query_params.get("date"), "date")
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        range_start, range_end = self._local_day_range(day, day)
+        tasks = (
+            self.filter_queryset(self.get_queryset())
+            .filter(due_at__gte=range_start, due_at__lt=range_end)
+            .order_by("due_at", "id")
+        )
+        events = (
+            CalendarEvent.objects.filter(user=request.user, date=day)
+            .select_related("todo")
+            .order_by("start_time")
+        )
+
+        return Response(
+            {
+                "date": day.isoformat(),
+                "tasks": self.get_serializer(tasks, many=True).data,
+                "events": CalendarEventSerializer(events, many=True).data,
+            }
+        )
 
     # =========== CHIA SẺ CÔNG VIỆC ===========
 
@@ -196,16 +1128,6 @@ class TodoViewSet(viewsets.ModelViewSet):
         # Tạo share_link ngắn
         share_link = str(uuid.uuid4())[:8]
 
-        task_share, created = TaskShare.objects.update_or_create(
-            task=todo,
-            shared_to=shared_to_user,
-            defaults={
-                "shared_by": request.user,
-                "permission": permission,
-                "share_link": share_link,
-            },
-        )
-
         # Gửi mail mời
         frontend_url = getattr(settings, "FRONTEND_URL", "http://localhost:3000")
         share_url = f"{frontend_url}/share/{share_link}"
@@ -224,13 +1146,26 @@ Nhấn vào link sau để xem và chấp nhận:
 {share_url}
 """
 
-        send_mail(
-            subject,
-            message,
-            None,
-            [shared_to_user.email],
-            fail_silently=True,
-        )
+        # Mail được xếp vào outbox cùng transaction với share,
+        # worker `manage.py send_outbox` sẽ gửi (không chờ SMTP trong request)
+        with transaction.atomic():
+            task_share, created = TaskShare.objects.update_or_create(
+                task=todo,
+                shared_to=shared_to_user,
+                defaults={
+                    "shared_by": request.user,
+                    "permission": permission,
+                    "share_link": share_link,
+                },
+            )
+            if shared_to_user.email:
+                enqueue_email(subject, message, shared_to_user.email)
+            if task_share.accepted:
+                # Share đã chấp nhận bị đổi quyền: người nhận thấy permission mới
+                Todo.objects.filter(pk=todo.pk).update(updated_at=timezone.now())
+                publish_todo_events("updated", {(todo.pk, shared_to_user.id)})
+        if task_share.accepted:
+            bump_user_version(shared_to_user.id)
 
         serializer = TaskShareSerializer(task_share)
         return Response(
@@ -238,23 +1173,120 @@ Nhấn vào link sau để xem và chấp nhận:
             status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
         )
 
+    def _share_list_response(self, request, shared_tasks):
+        # Luôn phân trang theo số trang (keyset chỉ hỗ trợ các cột của Todo)
+        paginator = TodoPagination()
+        page = paginator.paginate_queryset(
+            shared_tasks.select_related('task', 'shared_by', 'shared_to').order_by('-created_at', '-id'),
+            request,
+            view=self,
+        )
+        serializer = TaskShareSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=["get"], url_path="shared-with-me")
     def shared_with_me(self, request):
-        # Tối ưu với select_related
-        shared_tasks = TaskShare.objects.filter(
-            shared_to=request.user
-        ).select_related('task', 'shared_by', 'shared_to')
-        serializer = TaskShareSerializer(shared_tasks, many=True)
-        return Response(serializer.data)
+        return self._share_list_response(
+            request, TaskShare.objects.filter(shared_to=request.user)
+        )
 
     @action(detail=False, methods=["get"], url_path="shared-by-me")
     def shared_by_me(self, request):
-        # Tối ưu với select_related
-        shared_tasks = TaskShare.objects.filter(
-            shared_by=request.user
-        ).select_related('task', 'shared_by', 'shared_to')
-        serializer = TaskShareSerializer(shared_tasks, many=True)
-        return Response(serializer.data)
+        return self._share_list_response(
+            request, TaskShare.objects.filter(shared_by=request.user)
+        )
+
+
+# ============== Realtime (SSE) ==============
+
+# Giây giữa 2 lần gửi heartbeat (giữ kết nối qua proxy / phát hiện client đã đóng)
+STREAM_HEARTBEAT = getattr(settings, "TODO_EVENTS_HEARTBEAT", 15)
+STREAM_RETRY_MS = 5000
+STREAM_TICKET_TTL = getattr(settings, "TODO_STREAM_TICKET_TTL", 60)
+# Ticket chỉ dùng cho /todos/stream/: salt riêng nên không giải mã được ở chỗ khác
+STREAM_TICKET_SALT = "todo.stream-ticket"
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def todo_stream_ticket(request):
+    """
+    POST /api/todos/stream/ticket/
+    Cấp ticket ngắn hạn cho /api/todos/stream/?ticket=... (EventSource không gửi
+    được header, không đưa token đăng nhập lên URL/log). Lấy ticket mới trước
+    mỗi lần (re)connect.
+    """
+    ticket = signing.dumps(request.user.id, salt=STREAM_TICKET_SALT)
+    return Response({"ticket": ticket, "expires_in": STREAM_TICKET_TTL})
+
+
+async def _authenticate_stream(request):
+    """Ticket qua ?ticket= (EventSource) hoặc token qua header Authorization."""
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Token "):
+        try:
+            user, _ = await sync_to_async(TokenAuthentication().authenticate_credentials)(
+                header[len("Token "):].strip()
+            )
+        except AuthenticationFailed:
+            return None
+        return user
+
+    ticket = request.GET.get("ticket", "")
+    if not ticket:
+        return None
+    try:
+        user_id = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=STREAM_TICKET_TTL)
+    except signing.BadSignature:
+        return None
+    return await User.objects.filter(pk=user_id, is_active=True).afirst()
+
+
+def _sse_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps({'ids': event['ids']})}\n\n"
+
+
+async def todo_stream(request):
+    """
+    GET /api/todos/stream/?ticket=<ticket từ /api/todos/stream/ticket/>
+    Server-Sent Events: đẩy sự kiện created/updated/deleted (kèm ids) cho
+    task của mình và task được share đã chấp nhận; "resync" khi client đọc
+    không kịp. Sau khi (re)connect, client gọi /api/todos/changes/ để bù.
+
+    View async: chỉ phục vụ khi chạy bằng ASGI (gunicorn.conf.py dùng
+    uvicorn_worker.UvicornWorker) để mỗi kết nối chỉ là 1 coroutine. Dưới WSGI
+    mỗi kết nối giữ nguyên 1 worker sync nên trả 503.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Stream chỉ hỗ trợ khi chạy bằng ASGI"}, status=503)
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    user = await _authenticate_stream(request)
+    if user is None:
+        return JsonResponse({"error": "Ticket không hợp lệ hoặc đã hết hạn"}, status=401)
+
+    broker = get_broker()
+
+    async def stream():
+        subscription = broker.subscribe(user.id)
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse_event(event)
+        finally:
+            # Client ngắt kết nối: ASGI huỷ coroutine -> gỡ đăng ký
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Tắt buffer của nginx để sự kiện tới client ngay
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 # ============== Share link public & accept ==============
@@ -292,113 +1324,173 @@ def accept_share(request, share_link):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    ts.accepted = True
-    ts.save()
+    with transaction.atomic():
+        ts.accepted = True
+        ts.save()
+        # Task mới hiện ra với người nhận: đẩy lên đầu /todos/changes/
+        Todo.objects.filter(pk=ts.task_id).update(updated_at=timezone.now())
+        publish_todo_events("created", {(ts.task_id, request.user.id)})
+    bump_user_version(request.user.id)
 
     return Response({"status": "accepted"})
 
 
 # ============== Report ==============
 
-class ReportViewSet(viewsets.ViewSet):
+class ReportViewSet(ConditionalGetMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    conditional_actions = ("progress_report", "timeline_report", "by_priority_report")
     
     def get_cache_key(self, user_id, report_type):
-        return f"report_{user_id}_{report_type}"
+        return user_cache_key(user_id, report_type)
 
     @action(detail=False, methods=["get"], url_path="progress")
     def progress_report(self, request):
-        from django.core.cache import cache
-        
         user = request.user
         cache_key = self.get_cache_key(user.id, 'progress')
-        
-        # Try cache first
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-        
-        # Calculate if not cached
-        stats = Todo.objects.filter(owner=user).aggregate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(completed=True))
-        )
-        
-        total = stats['total']
-        completed = stats['completed']
-        in_progress = total - completed
-
-        data = {
-            "total_tasks": total,
-            "completed_tasks": completed,
-            "incomplete_tasks": in_progress,
-            "completion_rate": (completed / total * 100) if total else 0,
-        }
-        
-        # Cache for 60 seconds
-        cache.set(cache_key, data, 60)
-        return Response(data)
+
+        def compute():
+            # Đọc bộ đếm đã duy trì sẵn (1 lookup theo khoá chính)
+            stats = get_user_stats(user.id)
+
+            total = stats.total
+            completed = stats.completed
+            in_progress = total - completed
+
+            return {
+                "total_tasks": total,
+                "completed_tasks": completed,
+                "incomplete_tasks": in_progress,
+                "completion_rate": (completed / total * 100) if total else 0,
+            }
+
+        return Response(cached_report(cache_key, compute))
+
+    TIMELINE_TRUNC = {
+        "day": TruncDate,
+        "week": TruncWeek,
+        "month": TruncMonth,
+    }
 
     @action(detail=False, methods=["get"], url_path="timeline")
     def timeline_report(self, request):
+        """
+        GET /api/reports/timeline/?start=2025-01-01&end=2025-12-31&granularity=day|week|month
+        Số task tạo mới / đã hoàn thành theo ngày tạo, gom nhóm ngay trong DB.
+        """
         user = request.user
-        todos = (
-            Todo.objects.filter(owner=user)
-            .only("id", "created_at", "completed")
-            .order_by("created_at")
-        )
-        timeline = {}
-
-        for t in todos:
-            key = t.created_at.date().isoformat()
-            if key not in timeline:
-                timeline[key] = {"created": 0, "completed": 0}
-            timeline[key]["created"] += 1
-            if t.completed:
-                timeline[key]["completed"] += 1
-
-        result = [
-            {"date": k, "created": v["created"], "completed": v["completed"]}
-            for k, v in sorted(timeline.items())
-        ]
-        return Response(result)
+        granularity = request.query_params.get("granularity", "day")
+        if granularity not in self.TIMELINE_TRUNC:
+            return Response(
+                {"error": "granularity phải là day, week hoặc month"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        params = request.query_params
+        try:
+            start = _parse_date_param(params.get("start") or params.get("start_date"), "start", required=False)
+            end = _parse_date_param(params.get("end") or params.get("end_date"), "end", required=False)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = self.get_cache_key(user.id, f"timeline_{granularity}_{start}_{end}")
+
+        def compute():
+            tz = timezone.get_current_timezone()
+            qs = Todo.objects.filter(owner=user)
+            if start:
+                qs = qs.filter(
+                    created_at__gte=timezone.make_aware(datetime.combine(start, datetime.min.time()), tz)
+                )
+            if end:
+                qs = qs.filter(
+                    created_at__lt=timezone.make_aware(
+                        datetime.combine(end + timedelta(days=1), datetime.min.time()), tz
+                    )
+                )
+
+            trunc = self.TIMELINE_TRUNC[granularity]
+            stats = (
+                qs.annotate(period=trunc("created_at", tzinfo=tz))
+                .values("period")
+                .annotate(
+                    created=Count("id"),
+                    completed=Count("id", filter=Q(completed=True)),
+                )
+                .order_by("period")
+            )
+
+            result = []
+            for stat in stats:
+                period = stat["period"]
+                # TruncWeek/TruncMonth trả về datetime, TruncDate trả về date
+                if isinstance(period, datetime):
+                    period = timezone.localtime(period, tz).date()
+                result.append(
+                    {
+                        "date": period.isoformat(),
+                        "created": stat["created"],
+                        "completed": stat["completed"],
+                    }
+                )
+            return result
+
+        return Response(cached_report(cache_key, compute))
 
     @action(detail=False, methods=["get"], url_path="by-priority")
     def by_priority_report(self, request):
-        from django.core.cache import cache
-        
         user = request.user
         cache_key = self.get_cache_key(user.id, 'priority')
-        
-        # Try cache first
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-        
-        # Calculate if not cached
-        stats = Todo.objects.filter(owner=user).values('priority').annotate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(completed=True))
-        )
-
-        result = []
-        for stat in stats:
-            total = stat['total']
-            completed = stat['completed']
-            result.append({
-                'priority': stat['priority'],
-                'total': total,
-                'completed': completed,
-                'completion_rate': (completed / total * 100) if total else 0
-            })
-
-        # Cache for 60 seconds
-        cache.set(cache_key, result, 60)
-        return Response(result)
+
+        def compute():
+            stats = get_user_stats(user.id)
+
+            result = []
+            for priority, prefix in PRIORITY_PREFIX.items():
+                total = getattr(stats, f"{prefix}_total")
+                completed = getattr(stats, f"{prefix}_completed")
+                if not total:
+                    continue
+                result.append({
+                    'priority': priority,
+                    'total': total,
+                    'completed': completed,
+                    'completion_rate': (completed / total * 100) if total else 0
+                })
+            return result
+
+        return Response(cached_report(cache_key, compute))
 
 
 # ============== AI Predict ==============
 
+PREDICT_BATCH_MAX = 100
+
+
+class DummyTask:
+    """Task giả để predict từ dữ liệu rời (chưa lưu DB)."""
+
+    def __init__(self, priority, estimated_duration_min):
+        self.priority = priority
+        self.estimated_duration_min = estimated_duration_min
+        self.created_at = timezone.now()
+        self.planned_start_at = None
+
+    @property
+    def priority_numeric(self):
+        mapping = {
+            "Low": 1,
+            "low": 1,
+            "Medium": 2,
+            "medium": 2,
+            "High": 3,
+            "high": 3,
+            "Urgent": 3,
+            "urgent": 3,
+        }
+        return mapping.get(self.priority, 2)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def predict_task_completion(request):
@@ -433,32 +1525,105 @@ def predict_task_completion(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    class DummyTask:
-        def __init__(self, priority, estimated_duration_min):
-            self.priority = priority
-            self.estimated_duration_min = estimated_duration_min
-            self.created_at = timezone.now()
-            self.planned_start_at = None
-
-        @property
-        def priority_numeric(self):
-            mapping = {
-                "Low": 1,
-                "low": 1,
-                "Medium": 2,
-                "medium": 2,
-                "High": 3,
-                "high": 3,
-                "Urgent": 3,
-                "urgent": 3,
-            }
-            return mapping.get(self.priority, 2)
-
     task = DummyTask(priority, estimated_duration_min)
-    result = predict_task_on_time(task, extra_data=data, return_confidence=True)
+    try:
+        result = predict_task_on_time(task, extra_data=data, return_confidence=True)
+    except (TypeError, ValueError, OverflowError):
+        return Response(
+            {"error": "Giá trị đặc trưng không hợp lệ"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
     return Response(result)
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def predict_task_batch(request):
+    """
+    Dự đoán theo lô (tối đa PREDICT_BATCH_MAX task), chỉ 1 lần gọi model:
+    - { "task_ids": [1, 2, ...] }  -> task của user
+    - { "tasks": [{"priority": "High", "estimated_duration_min": 90, ...}, ...] }
+    Tuỳ chọn "model": tên model trong settings.AI_MODELS (mặc định "default").
+    """
+    task_ids = request.data.get("task_ids")
+    items = request.data.get("tasks")
+    model_name = request.data.get("model") or DEFAULT_MODEL_NAME
+    if model_name not in registry.names():
+        return Response(
+            {"error": f"Model '{model_name}' không tồn tại"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if task_ids is not None:
+        if not isinstance(task_ids, list):
+            return Response(
+                {"error": "task_ids phải là danh sách"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            task_ids = list(dict.fromkeys(int(pk) for pk in task_ids))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "task_ids chỉ chứa số nguyên"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(task_ids) > PREDICT_BATCH_MAX:
+            return Response(
+                {"error": f"Tối đa {PREDICT_BATCH_MAX} task mỗi lần"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        todos = Todo.objects.filter(owner=request.user, id__in=task_ids).in_bulk()
+        tasks = [todos[pk] for pk in task_ids if pk in todos]
+        predictions = predict_tasks_on_time(tasks, model_name=model_name)
+        return Response(
+            {
+                "results": [
+                    {"task_id": task.id, **prediction}
+                    for task, prediction in zip(tasks, predictions)
+                ],
+                "missing": [pk for pk in task_ids if pk not in todos],
+            }
+        )
+
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return Response(
+            {"error": "Cần task_ids hoặc tasks (danh sách object)"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(items) > PREDICT_BATCH_MAX:
+        return Response(
+            {"error": f"Tối đa {PREDICT_BATCH_MAX} task mỗi lần"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    tasks = []
+    for index, item in enumerate(items):
+        if item.get("estimated_duration_min") is None:
+            return Response(
+                {"error": f"tasks[{index}]: thiếu estimated_duration_min"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        task = DummyTask(item.get("priority", "Medium"), item["estimated_duration_min"])
+        try:
+            quantize_features(features_from_task(task, item))
+        except (TypeError, ValueError, OverflowError):
+            return Response(
+                {"error": f"tasks[{index}]: giá trị đặc trưng không hợp lệ"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        tasks.append(task)
+
+    predictions = predict_tasks_on_time(tasks, items, model_name=model_name)
+    return Response(
+        {
+            "results": [
+                {"index": index, **prediction}
+                for index, prediction in enumerate(predictions)
+            ]
+        }
+    )
+
+
 # ============== Chatbot tạo task ==============
 
 @api_view(["POST"])
@@ -475,35 +1640,21 @@ def chatbot_create_task(request):
 
     chatbot = TaskChatbot()
     task_data = chatbot.parse_message(message)
-
-    # Parse due_at - FIXED: Handle timezone properly
-    due_at = None
-    if task_data.get("due_at"):
-        try:
-            # Parse ISO string and ensure it's timezone-aware
-            due_at_str = task_data["due_at"]
-            if 'T' in due_at_str:
-                due_at = datetime.fromisoformat(due_at_str.replace('Z', '+00:00'))
-            else:
-                # If no time component, parse as date only
-                due_at = datetime.fromisoformat(due_at_str)
-            
-            # Make timezone-aware if needed
-            if due_at.tzinfo is None:
-                due_at = timezone.make_aware(due_at)
-        except Exception as e:
-            print(f"Error parsing due_at: {e}, value: {task_data.get('due_at')}")
-            pass
-
-    todo = Todo.objects.create(
-        owner=request.user,
-        title=task_data.get("title", "Task mới"),
-        description=task_data.get("description", ""),
-        due_at=due_at,
-        priority=task_data.get("priority", "Medium"),
-        completed=False,
-        tags="",
-    )
+    due_at = _parse_chatbot_due_at(task_data.get("due_at"))
+
+    with transaction.atomic():
+        todo = Todo.objects.create(
+            owner=request.user,
+            title=task_data.get("title", "Task mới"),
+            description=task_data.get("description", ""),
+            due_at=due_at,
+            priority=task_data.get("priority", "Medium"),
+            completed=False,
+            tags="",
+        )
+        apply_stats_delta(todo.owner_id, todo_stats_delta(todo.priority, todo.completed))
+        publish_todo_events("created", {(todo.id, todo.owner_id)})
+    bump_user_version(request.user.id)
 
     prediction = None
     try:
@@ -511,20 +1662,128 @@ def chatbot_create_task(request):
     except Exception as e:
         print(f"Prediction error: {e}")
 
-    response_text = chatbot.generate_response(
-        TodoSerializer(todo).data,
-        prediction,
-    )
+    task = TodoSerializer(todo).data
+    response_text = chatbot.generate_response(task, prediction)
 
     return JsonResponse(
         {
-            "task": TodoSerializer(todo).data,
+            "task": task,
             "response": response_text,
             "prediction": prediction,
         }
     )
 
 
+CHATBOT_BATCH_MAX = 100
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def chatbot_create_tasks_batch(request):
+    """
+    Tạo nhiều task từ 1 lần dán danh sách:
+    Input:  { "message": "- học Python 2 tiếng chiều mai\n- nộp báo cáo thứ 6 gấp" }
+            hoặc { "messages": ["...", "..."] }
+    Output: { "created": 2, "tasks": [{id, title, priority, due_at, prediction}], "response": "..." }
+    """
+    chatbot = TaskChatbot()
+    messages = request.data.get("messages")
+    if messages is None:
+        messages = chatbot.split_messages(request.data.get("message"))
+    elif isinstance(messages, list) and all(isinstance(m, str) for m in messages):
+        messages = [m.strip() for m in messages if m.strip()]
+    else:
+        return Response(
+            {"error": "messages phải là danh sách chuỗi"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if not messages:
+        return HttpResponseBadRequest("Message không được trống")
+    if len(messages) > CHATBOT_BATCH_MAX:
+        return Response(
+            {"error": f"Tối đa {CHATBOT_BATCH_MAX} task mỗi lần"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    todos = []
+    for message in messages:
+        task_data = chatbot.parse_message(message)
+        todos.append(
+            Todo(
+                owner=request.user,
+                title=task_data.get("title", "Task mới"),
+                description=task_data.get("description", ""),
+                due_at=_parse_chatbot_due_at(task_data.get("due_at")),
+                priority=task_data.get("priority", "Medium"),
+                completed=False,
+                tags="",
+            )
+        )
+
+    delta = Counter()
+    for todo in todos:
+        delta.update(todo_stats_delta(todo.priority, todo.completed))
+    with transaction.atomic():
+        todos = Todo.objects.bulk_create(todos)
+        apply_stats_delta(request.user.id, delta)
+        publish_todo_events("created", {(todo.id, request.user.id) for todo in todos})
+    bump_user_version(request.user.id)
+
+    try:
+        predictions = predict_tasks_on_time(todos)
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        predictions = [None] * len(todos)
+
+    tasks = [
+        {
+            "id": row["id"],
+            "title": row["title"],
+            "priority": row["priority"],
+            "due_at": row["due_at"],
+            "prediction": prediction,
+        }
+        for row, prediction in zip(TodoSerializer(todos, many=True).data, predictions)
+    ]
+    at_risk = sum(
+        1 for prediction in predictions
+        if prediction and prediction.get("on_time_prediction") == 0
+    )
+    response_text = f"Đã tạo {len(tasks)} task thành công!"
+    if at_risk:
+        response_text += f"\nAI cảnh báo: {at_risk} task có nguy cơ trễ hạn"
+
+    return Response(
+        {
+            "created": len(tasks),
+            "tasks": tasks,
+            "response": response_text,
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
+
+def _parse_chatbot_due_at(value):
+    """Chuỗi ISO do TaskChatbot trả về -> datetime có timezone (None nếu lỗi)."""
+    if not value:
+        return None
+    try:
+        if 'T' in value:
+            due_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        else:
+            # If no time component, parse as date only
+            due_at = datetime.fromisoformat(value)
+
+        # Make timezone-aware if needed
+        if due_at.tzinfo is None:
+            due_at = timezone.make_aware(due_at)
+        return due_at
+    except Exception as e:
+        print(f"Error parsing due_at: {e}, value: {value}")
+        return None
+
+
 # ============== Public Auth Views ==============
 
 class PublicRegisterView(RegisterView):